@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark cost_logs range queries before and after the index migrations.
+
+Loads --rows synthetic log rows into a cost_logs table with the original schema (primary
+key only), times typical date range queries, applies the migrations and times them again.
+Runs on SQLite by default; pass --url to use another database (e.g. a scratch Postgres,
+with COST_LOGS_PARTITIONED=true to include the partitioned layout).
+
+Usage: python benchmark_cost_logs.py [--rows 1000000] [--services 50] [--days 730] [--repeat 20] [--url URL]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine, inspect, text
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from migrations import applied_revisions, apply_migrations, revert_migrations
+
+START = date(2023, 1, 1)
+
+QUERIES = {
+    "one service, 1 month": (
+        "SELECT date, amount FROM cost_logs WHERE service = :service AND date BETWEEN :start AND :end",
+        {"service": "Service 007", "start": date(2024, 3, 1), "end": date(2024, 3, 31)},
+    ),
+    "all services, 1 week": (
+        "SELECT service, SUM(amount) FROM cost_logs WHERE date BETWEEN :start AND :end GROUP BY service",
+        {"start": date(2024, 6, 3), "end": date(2024, 6, 9)},
+    ),
+    "latest 100 rows": (
+        "SELECT * FROM cost_logs WHERE date >= :start ORDER BY date DESC LIMIT 100",
+        {"start": date(2024, 12, 1)},
+    ),
+}
+
+
+def load_rows(conn, rows: int, services: int, days: int) -> None:
+    conn.execute(text(
+        "CREATE TABLE cost_logs (id INTEGER PRIMARY KEY, date DATE NOT NULL, service VARCHAR NOT NULL, amount FLOAT NOT NULL)"
+        if conn.dialect.name == "sqlite" else
+        "CREATE TABLE cost_logs (id SERIAL PRIMARY KEY, date DATE NOT NULL, service VARCHAR NOT NULL, amount FLOAT NOT NULL)"
+    ))
+    rng = np.random.default_rng(0)
+    day_offsets = rng.integers(0, days, rows)
+    service_ids = rng.integers(0, services, rows)
+    amounts = rng.uniform(0, 100, rows).round(2)
+    batch = 100_000
+    for offset in range(0, rows, batch):
+        conn.execute(
+            text("INSERT INTO cost_logs (date, service, amount) VALUES (:date, :service, :amount)"),
+            [
+                {"date": START + timedelta(days=int(d)), "service": f"Service {s:03d}", "amount": float(a)}
+                for d, s, a in zip(day_offsets[offset:offset + batch], service_ids[offset:offset + batch],
+                                   amounts[offset:offset + batch])
+            ]
+        )
+
+
+def time_queries(conn, repeat: int) -> dict:
+    if conn.dialect.name == "sqlite":
+        conn.execute(text("ANALYZE"))
+    else:
+        conn.execute(text("ANALYZE cost_logs"))
+    timings = {}
+    for name, (sql, params) in QUERIES.items():
+        conn.execute(text(sql), params).fetchall()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(text(sql), params).fetchall()
+        timings[name] = (time.perf_counter() - start) / repeat * 1000
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows in cost_logs")
+    parser.add_argument("--services", type=int, default=50, help="Distinct services")
+    parser.add_argument("--days", type=int, default=730, help="Days of history")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per query")
+    parser.add_argument("--url", help="Synchronous database URL (default: temporary SQLite file)")
+    args = parser.parse_args()
+
+    print("Cost Log Range Query Benchmark")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(args.url or f"sqlite:///{os.path.join(tmp, 'cost_logs.db')}")
+        if {"cost_logs", "schema_migrations"} & set(inspect(engine).get_table_names()):
+            sys.exit("cost_logs already exists in this database; point --url at a scratch database")
+        with engine.begin() as conn:
+            start = time.perf_counter()
+            load_rows(conn, args.rows, args.services, args.days)
+            print(f"Loaded {args.rows:,} rows ({engine.dialect.name}) in {time.perf_counter() - start:.1f}s")
+
+        with engine.begin() as conn:
+            before = time_queries(conn, args.repeat)
+        with engine.begin() as conn:
+            start = time.perf_counter()
+            apply_migrations(conn)
+            print(f"Migrations {', '.join(applied_revisions(conn))} applied in {time.perf_counter() - start:.1f}s")
+        with engine.begin() as conn:
+            after = time_queries(conn, args.repeat)
+            if args.url:
+                revert_migrations(conn)
+                conn.execute(text("DROP TABLE cost_logs"))
+                conn.execute(text("DROP TABLE schema_migrations"))
+        engine.dispose()
+
+    print()
+    print(f"{'query':<24} {'no index':>10} {'migrated':>10} {'speedup':>8}")
+    print("-" * 56)
+    for name in QUERIES:
+        print(f"{name:<24} {before[name]:>8.1f}ms {after[name]:>8.2f}ms {before[name] / after[name]:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
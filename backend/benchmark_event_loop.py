@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark event-loop responsiveness: /health latency while heavy forecasts run concurrently.
+
+Serves a synthetic cost export with uvicorn in a child process, keeps --heavy clients
+requesting uncached forecasts, and samples /health latency.
+Compares analytics run inline on the event loop (COMPUTE_THREADS=0, the old behavior)
+with the bounded compute executor.
+
+Usage: python benchmark_event_loop.py [--days 365] [--groups 300] [--heavy 4] [--seconds 5] [--threads 4]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_ingest import write_export
+
+# Runs the API in a child process on the synthetic export
+SERVER_SCRIPT = """
+import sys, uvicorn
+from utils import compute, file_loader
+file_loader.MOCK_DATA_PATH = sys.argv[1]
+file_loader.SNAPSHOT_ENABLED = False
+compute.COMPUTE_THREADS = int(sys.argv[2])
+from main import app
+uvicorn.run(app, host="127.0.0.1", port=int(sys.argv[3]), log_level="warning")
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def heavy_client(client: httpx.AsyncClient, stop: asyncio.Event, counts: dict) -> None:
+    n_days = 1
+    while not stop.is_set():
+        r = await client.get(f"/api/forecast?n_days={n_days}")
+        counts[r.status_code] = counts.get(r.status_code, 0) + 1
+        n_days = n_days % 30 + 1
+
+
+async def measure(base_url: str, heavy: int, seconds: float) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        # Wait for startup (the lifespan warms the dataset)
+        while True:
+            try:
+                await client.get("/health")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+
+        stop, counts = asyncio.Event(), {}
+        workers = [asyncio.create_task(heavy_client(client, stop, counts)) for _ in range(heavy)]
+        await asyncio.sleep(0.5)
+
+        latencies = []
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await client.get("/health")
+            latencies.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(0.01)
+
+        stop.set()
+        await asyncio.gather(*workers)
+
+    return {"p50": np.percentile(latencies, 50), "p99": np.percentile(latencies, 99),
+            "samples": len(latencies), "forecasts": counts}
+
+
+def run_mode(path: str, threads: int, heavy: int, seconds: float) -> dict:
+    port = free_port()
+    env = {**os.environ, "FORECAST_CACHE_MAX_ENTRIES": "0"}  # every heavy request really computes
+    server = subprocess.Popen(
+        [sys.executable, "-c", SERVER_SCRIPT, path, str(threads), str(port)],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env, stdout=subprocess.DEVNULL
+    )
+    try:
+        return asyncio.run(measure(f"http://127.0.0.1:{port}", heavy, seconds))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365, help="Days of history")
+    parser.add_argument("--groups", type=int, default=300, help="Services per day")
+    parser.add_argument("--heavy", type=int, default=4, help="Concurrent forecast clients")
+    parser.add_argument("--seconds", type=float, default=5, help="Measurement time per mode")
+    parser.add_argument("--threads", type=int, default=4, help="Compute executor threads")
+    args = parser.parse_args()
+
+    print("Event Loop Responsiveness Benchmark")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "export.json")
+        write_export(path, args.days, args.groups)
+
+        print(f"Dataset: {args.days} days x {args.groups} services, {args.heavy} concurrent forecast clients")
+        print()
+        print(f"{'mode':<22} {'health p50':>11} {'health p99':>11} {'samples':>8}  forecasts")
+        print("-" * 72)
+        for name, threads in (("inline (event loop)", 0), (f"executor ({args.threads} threads)", args.threads)):
+            result = run_mode(path, threads, args.heavy, args.seconds)
+            print(f"{name:<22} {result['p50']:>9.1f}ms {result['p99']:>9.1f}ms {result['samples']:>8}  {result['forecasts']}")
+
+
+if __name__ == "__main__":
+    main()
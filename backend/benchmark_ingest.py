@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark cost data ingestion: json.load + flatten vs streaming into columnar buffers.
+
+Generates a synthetic multi-year Cost Explorer export and ingests it in a fresh
+subprocess per method, reporting throughput (rows/s) and peak RSS.
+
+Usage: python benchmark_ingest.py [--days 1095] [--groups 400]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+METHODS = {
+    "json.load + build": "build_cost_store(json.load(open(path)))",
+    "streaming": "stream_cost_store(path)",
+}
+
+# Runs inside the child process; prints rows, seconds, baseline RSS and peak RSS (KB)
+CHILD_SCRIPT = """
+import json, resource, sys, time
+from utils.cost_store import build_cost_store, stream_cost_store
+path = sys.argv[1]
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+store = {expr}
+elapsed = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(len(store), elapsed, baseline, peak)
+"""
+
+
+def write_export(path: str, n_days: int, n_groups: int) -> None:
+    """Write a synthetic Cost Explorer export, one day at a time."""
+    rng = random.Random(42)
+    services = [f"Service {i:04d}" for i in range(n_groups)]
+    start = date(2022, 1, 1)
+
+    with open(path, "w") as f:
+        f.write('{"GroupDefinitions": [{"Type": "DIMENSION", "Key": "SERVICE"}], "ResultsByTime": [')
+        for i in range(n_days):
+            day = start + timedelta(days=i)
+            entry = {
+                "TimePeriod": {"Start": day.isoformat(), "End": (day + timedelta(days=1)).isoformat()},
+                "Groups": [
+                    {"Keys": [service], "Metrics": {"UnblendedCost": {"Amount": f"{rng.uniform(0, 100):.2f}", "Unit": "USD"}}}
+                    for service in services
+                ],
+                "Estimated": False,
+            }
+            if i:
+                f.write(",")
+            json.dump(entry, f)
+        f.write('], "DimensionValueAttributes": []}')
+
+
+def run_method(expr: str, path: str) -> dict:
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT.format(expr=expr), path],
+        cwd=backend_dir, capture_output=True, text=True, check=True
+    ).stdout.split()
+    rows, elapsed, baseline_kb, peak_kb = int(output[0]), float(output[1]), int(output[2]), int(output[3])
+    return {"rows": rows, "seconds": elapsed, "peak_mb": peak_kb / 1024, "delta_mb": (peak_kb - baseline_kb) / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=1095, help="Days of history (default: 3 years)")
+    parser.add_argument("--groups", type=int, default=400, help="Groups (services/usage types) per day")
+    args = parser.parse_args()
+
+    print("Cost Data Ingestion Benchmark")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "export.json")
+        write_export(path, args.days, args.groups)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        print(f"Export: {args.days} days x {args.groups} groups = {args.days * args.groups:,} rows, {size_mb:.1f} MB")
+        print()
+        print(f"{'method':<20} {'seconds':>8} {'rows/s':>12} {'peak RSS':>10} {'ingest RSS':>11}")
+        print("-" * 65)
+
+        for name, expr in METHODS.items():
+            result = run_method(expr, path)
+            print(f"{name:<20} {result['seconds']:>8.2f} {result['rows'] / result['seconds']:>12,.0f} "
+                  f"{result['peak_mb']:>8.0f}MB {result['delta_mb']:>9.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-request response serialization for large analytics payloads.
+
+Serves precomputed results from a minimal FastAPI app three ways and times requests:
+  - validated:  response_model validation + jsonable_encoder + stdlib json (the old path)
+  - encoder:    jsonable_encoder + FastJSONResponse (default_response_class only)
+  - trusted:    trusted_response(), straight to FastJSONResponse
+
+Usage: python benchmark_serialization.py [--services 300] [--days 365] [--repeat 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ml_utils import forecast_costs
+from schemas import ForecastResponse
+from utils.responses import FastJSONResponse, orjson, trusted_response
+
+
+def build_payloads(n_services: int, n_days: int) -> dict:
+    rng = np.random.default_rng(0)
+    start = date(2024, 1, 1)
+    records = [
+        {"date": (start + timedelta(days=d)).isoformat(), "service": f"Service {s:04d}", "amount": round(float(a), 2)}
+        for d in range(n_days) for s, a in zip(range(n_services), rng.uniform(0, 100, n_services))
+    ]
+    return {
+        "forecast (30 days)": (forecast_costs(records, n_days=30) | {"status": "success"}, ForecastResponse),
+        "cost records": ({"cost_data": records, "total_records": len(records)}, None),
+    }
+
+
+def make_client(content: dict, model) -> TestClient:
+    app = FastAPI(default_response_class=FastJSONResponse)
+
+    @app.get("/validated", response_model=model, response_class=JSONResponse)
+    def validated():
+        return content
+
+    @app.get("/encoder", response_model=model)
+    def encoder():
+        return content
+
+    @app.get("/trusted", response_model=model)
+    def trusted():
+        return trusted_response(content, model)
+
+    return TestClient(app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--services", type=int, default=300, help="Services in the synthetic dataset")
+    parser.add_argument("--days", type=int, default=365, help="Days of history")
+    parser.add_argument("--repeat", type=int, default=20, help="Requests per measurement")
+    args = parser.parse_args()
+
+    print("Response Serialization Benchmark")
+    print("=" * 60)
+    print(f"Encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib json (orjson not installed)'}")
+    print()
+    print(f"{'payload':<20} {'mode':<10} {'ms/request':>11} {'body':>10}")
+    print("-" * 55)
+
+    for name, (content, model) in build_payloads(args.services, args.days).items():
+        client = make_client(content, model)
+        for mode in ("validated", "encoder", "trusted"):
+            body = client.get(f"/{mode}").content
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                client.get(f"/{mode}")
+            elapsed = (time.perf_counter() - start) / args.repeat
+            print(f"{name:<20} {mode:<10} {elapsed * 1000:>11.1f} {len(body) / 1024:>8.0f}KB")
+
+
+if __name__ == "__main__":
+    main()
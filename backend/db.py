@@ -1,8 +1,13 @@
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from dotenv import load_dotenv
+from typing import Any, Dict
 import os
+import threading
+import time
 
 from models import Base
 
@@ -12,13 +17,103 @@ load_dotenv()
 # Default to local sqlite for tests/CI if env var is missing
 DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite+aiosqlite:///./test.db"
 
+# Serverless runtimes freeze or discard the process between requests, so pooled
+# connections would go stale or pile up on the database: no pool there by default
+SERVERLESS = any(os.getenv(name) for name in ("AWS_LAMBDA_FUNCTION_NAME", "VERCEL", "K_SERVICE"))
+
+# Connection pool (0 disables pooling: one connection per session, closed afterwards)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "0" if SERVERLESS else "5"))
+# Extra connections allowed above DB_POOL_SIZE under load (closed when returned)
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds to wait for a free connection before failing the request
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Replace connections older than this many seconds (managed Postgres/proxies drop idle ones)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+# Test each connection with a round trip on checkout, so dropped ones are replaced transparently
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Prepared statements cached per connection (asyncpg); 0 behind PgBouncer in transaction mode
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+_pool_stats_lock = threading.Lock()
+_pool_stats = {"checkouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0, "timeouts": 0}
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection (including connecting)."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            with _pool_stats_lock:
+                _pool_stats["timeouts"] += 1
+            raise
+        waited = time.perf_counter() - start
+        with _pool_stats_lock:
+            _pool_stats["checkouts"] += 1
+            _pool_stats["wait_seconds_total"] += waited
+            _pool_stats["wait_seconds_max"] = max(_pool_stats["wait_seconds_max"], waited)
+        return connection
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """create_async_engine() keyword arguments for the configured pool and driver."""
+    backend = make_url(url).get_backend_name()
+    # SQLite (local dev/tests) keeps the driver's own pool choice
+    if backend == "sqlite":
+        return {}
+    if DB_POOL_SIZE <= 0:
+        return {"poolclass": NullPool}
+
+    options = {
+        "poolclass": TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if make_url(url).get_driver_name() == "asyncpg":
+        # SQLAlchemy's prepared statement cache and asyncpg's own statement cache
+        options["connect_args"] = {
+            "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
+
 # Creating Async Engine (Connection engine)
-engine = create_async_engine(DATABASE_URL, echo=False, poolclass=NullPool)
+engine = create_async_engine(DATABASE_URL, echo=False, **engine_options(DATABASE_URL))
 
 # Creating Async Session Factory
 AsyncSessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Connection pool usage for capacity planning (checked out, overflow, checkout wait times)."""
+    pool = engine.pool
+    stats: Dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update({
+            "size": pool.size(),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+        })
+    with _pool_stats_lock:
+        checkouts = _pool_stats["checkouts"]
+        stats.update({
+            "checkouts": checkouts,
+            "timeouts": _pool_stats["timeouts"],
+            "wait_ms_avg": round(_pool_stats["wait_seconds_total"] / checkouts * 1000, 3) if checkouts else 0.0,
+            "wait_ms_max": round(_pool_stats["wait_seconds_max"] * 1000, 3),
+        })
+    return stats
+
+
 # Dependency for FastAPI routes
 async def get_session():
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
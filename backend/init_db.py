@@ -1,10 +1,12 @@
 import asyncio
 from db import engine
 from models import Base
+from migrations import run_migrations
 
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    await run_migrations(engine)
 
 if __name__ == "__main__":
     asyncio.run(init_db())
\ No newline at end of file
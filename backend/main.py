@@ -6,13 +6,24 @@ import asyncio
 from routes import log, insights, mock_data, clusters, anomalies, forecasts, recommendations, ml_data, debug_visuals, auth, data_source
 from db import engine
 from models import Base
+from migrations import ensure_cost_log_partitions, lock_schema, run_migrations
+from utils.file_loader import load_cost_store
+from utils.parallel import shutdown_process_pool
+from utils.compute import shutdown_compute_executor
+from utils.responses import FastJSONResponse
 from contextlib import asynccontextmanager
 
 # Database initialization function
 async def init_database():
     """Initialize database tables on startup."""
     async with engine.begin() as conn:
+        # Workers start together: one creates the tables, the others wait and find them
+        await conn.run_sync(lock_schema)
         await conn.run_sync(Base.metadata.create_all)
+    # Schema changes for existing databases (indexes, optional partitioning), also under the lock
+    await run_migrations(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(ensure_cost_log_partitions)
 
 # Lifespan event handler for startup/shutdown
 @asynccontextmanager
@@ -23,12 +34,22 @@ async def lifespan(app: FastAPI):
             await init_database()
             print("✅ Database tables initialized successfully")
         except Exception as e:
+            # Don't serve on a half-migrated schema: fail startup so the worker is restarted
             print(f"❌ Database initialization failed: {e}")
+            raise
+    # Warm the cost dataset (memory-mapped snapshot, rebuilt if the source JSON changed)
+    try:
+        store = load_cost_store()
+        print(f"✅ Cost data loaded ({len(store)} records)")
+    except Exception as e:
+        print(f"❌ Cost data warm-up failed: {e}")
     yield
-    # Shutdown: cleanup if needed
-    pass
+    # Shutdown: stop analytics threads and model-fitting worker processes, close pooled connections
+    shutdown_compute_executor()
+    shutdown_process_pool()
+    await engine.dispose()
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # Add GZip compression for better performance
 app.add_middleware(GZipMiddleware, minimum_size=1000)
@@ -45,6 +66,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination cursors of /api/logs and the NDJSON cost exports
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Authentication routes
@@ -0,0 +1,156 @@
+"""
+Versioned schema migrations, applied in order and recorded in `schema_migrations`.
+
+Each module in migrations/versions defines (in the style of Alembic revisions):
+  - revision / down_revision: its id and the id it builds on
+  - upgrade(connection) / downgrade(connection): changes on a synchronous SQLAlchemy Connection
+  - enabled(connection) -> bool (optional): when False the revision is recorded as
+    'skipped' (later revisions still apply); it is applied once enabled() becomes True,
+    so e.g. an opt-in or dialect-specific layout can be switched on later
+
+Run with `python -m migrations [upgrade|downgrade <revision>|current|partitions]`; the API
+applies pending migrations (and creates upcoming cost_logs partitions) on startup in
+production (after create_all). On Postgres every run holds a transaction-level advisory
+lock, so workers starting together apply each change once.
+"""
+
+import importlib
+import pkgutil
+from datetime import datetime
+from types import ModuleType
+from typing import Dict, List, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from . import versions
+
+VERSION_TABLE = "schema_migrations"
+PARTITIONS_REVISION = "0002_cost_log_partitions"
+# pg_advisory_xact_lock key shared by everything that changes the schema
+MIGRATION_LOCK_KEY = 7_441_022_310
+
+
+def load_revisions() -> List[ModuleType]:
+    """Revision modules ordered by their down_revision chain."""
+    modules = [
+        importlib.import_module(f"{versions.__name__}.{info.name}")
+        for info in pkgutil.iter_modules(versions.__path__)
+    ]
+    by_parent = {module.down_revision: module for module in modules}
+    if len(by_parent) != len(modules):
+        raise RuntimeError("Migration history has more than one revision with the same down_revision")
+
+    ordered, parent = [], None
+    while parent in by_parent:
+        ordered.append(by_parent[parent])
+        parent = ordered[-1].revision
+    if len(ordered) != len(modules):
+        raise RuntimeError("Migration history is not a single chain")
+    return ordered
+
+
+def lock_schema(connection: Connection) -> None:
+    """
+    Serialise schema changes across processes until the current transaction ends
+    (Postgres advisory lock; a no-op on SQLite, which locks the whole file on write).
+    """
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+
+def revision_status(connection: Connection) -> Dict[str, str]:
+    """Recorded revisions: revision -> 'applied' or 'skipped' (not enabled when its turn came)."""
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (revision VARCHAR(64) PRIMARY KEY, applied_at TIMESTAMP NOT NULL,"
+        " status VARCHAR(16) NOT NULL DEFAULT 'applied')"
+    ))
+    # Version tables created before skipped revisions were recorded
+    if "status" not in {column["name"] for column in inspect(connection).get_columns(VERSION_TABLE)}:
+        connection.execute(text(f"ALTER TABLE {VERSION_TABLE} ADD COLUMN status VARCHAR(16) NOT NULL DEFAULT 'applied'"))
+    rows = connection.execute(text(f"SELECT revision, status FROM {VERSION_TABLE}"))
+    return {row[0]: row[1] for row in rows}
+
+
+def applied_revisions(connection: Connection) -> List[str]:
+    return [revision for revision, status in revision_status(connection).items() if status == "applied"]
+
+
+def _record(connection: Connection, revision: str, status: str, recorded: bool) -> None:
+    params = {"revision": revision, "applied_at": datetime.utcnow(), "status": status}
+    if recorded:
+        connection.execute(text(
+            f"UPDATE {VERSION_TABLE} SET applied_at = :applied_at, status = :status WHERE revision = :revision"
+        ), params)
+    else:
+        connection.execute(text(
+            f"INSERT INTO {VERSION_TABLE} (revision, applied_at, status) VALUES (:revision, :applied_at, :status)"
+        ), params)
+
+
+def apply_migrations(connection: Connection, target: Optional[str] = None) -> List[str]:
+    """
+    Apply pending revisions up to `target` (default: all). Returns the revisions applied.
+
+    Call inside a transaction (engine.begin()); on Postgres the DDL is transactional,
+    so a failing revision leaves the schema unchanged. Revisions that are not enabled
+    are recorded as 'skipped' and retried on later runs.
+    """
+    lock_schema(connection)
+    status = revision_status(connection)
+    applied = []
+    for module in load_revisions():
+        if status.get(module.revision) != "applied":
+            enabled = getattr(module, "enabled", None)
+            if enabled is not None and not enabled(connection):
+                if module.revision not in status:
+                    _record(connection, module.revision, "skipped", recorded=False)
+            else:
+                module.upgrade(connection)
+                _record(connection, module.revision, "applied", recorded=module.revision in status)
+                applied.append(module.revision)
+        if module.revision == target:
+            break
+    return applied
+
+
+def revert_migrations(connection: Connection, target: Optional[str] = None) -> List[str]:
+    """
+    Downgrade applied revisions newer than `target` (None reverts everything), forgetting
+    skipped ones. Returns the revisions reverted.
+    """
+    lock_schema(connection)
+    status = revision_status(connection)
+    reverted = []
+    for module in reversed(load_revisions()):
+        if module.revision == target:
+            break
+        if module.revision in status:
+            if status[module.revision] == "applied":
+                module.downgrade(connection)
+                reverted.append(module.revision)
+            connection.execute(text(f"DELETE FROM {VERSION_TABLE} WHERE revision = :revision"), {"revision": module.revision})
+    return reverted
+
+
+def ensure_cost_log_partitions(connection: Connection, months_ahead: Optional[int] = None) -> List[str]:
+    """
+    Create missing monthly cost_logs partitions from the current month through `months_ahead`
+    months ahead (default COST_LOGS_PARTITION_MONTHS_AHEAD). Returns the partitions created.
+
+    Rows for a month without a partition land in cost_logs_default, after which that month's
+    partition can no longer be added, so run this regularly (e.g. a monthly cron of
+    `python -m migrations partitions`). No-op unless the partitioning revision is applied.
+    """
+    lock_schema(connection)
+    if PARTITIONS_REVISION not in applied_revisions(connection):
+        return []
+    module = next(module for module in load_revisions() if module.revision == PARTITIONS_REVISION)
+    return module.create_upcoming_partitions(connection, months_ahead)
+
+
+async def run_migrations(engine: AsyncEngine) -> List[str]:
+    """Apply all pending migrations on an async engine."""
+    async with engine.begin() as conn:
+        return await conn.run_sync(apply_migrations)
@@ -0,0 +1,32 @@
+"""Usage: python -m migrations [upgrade [revision] | downgrade <revision|base> | current | partitions [months_ahead]]"""
+
+import asyncio
+import sys
+
+from db import engine
+from migrations import apply_migrations, ensure_cost_log_partitions, revert_migrations, revision_status
+
+
+async def main(args) -> None:
+    command = args[0] if args else "upgrade"
+    async with engine.begin() as conn:
+        if command == "upgrade":
+            applied = await conn.run_sync(apply_migrations, args[1] if len(args) > 1 else None)
+            print(f"Applied: {', '.join(applied) or 'nothing (up to date)'}")
+        elif command == "downgrade" and len(args) > 1:
+            reverted = await conn.run_sync(revert_migrations, None if args[1] == "base" else args[1])
+            print(f"Reverted: {', '.join(reverted) or 'nothing'}")
+        elif command == "current":
+            status = await conn.run_sync(revision_status)
+            print("\n".join(f"{revision} ({status[revision]})" for revision in sorted(status)) or "No migrations applied")
+        elif command == "partitions":
+            created = await conn.run_sync(ensure_cost_log_partitions, int(args[1]) if len(args) > 1 else None)
+            print(f"Created partitions: {', '.join(created) or 'nothing (up to date or not partitioned)'}")
+        else:
+            print(__doc__)
+            sys.exit(1)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
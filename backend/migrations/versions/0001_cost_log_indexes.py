@@ -0,0 +1,18 @@
+"""Index cost_logs for date range queries, overall and per service."""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+revision = "0001_cost_log_indexes"
+down_revision = None
+
+
+def upgrade(connection: Connection) -> None:
+    # IF NOT EXISTS: databases created by create_all() already have them (models.CostLog)
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_cost_logs_service_date ON cost_logs (service, date)"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_cost_logs_date ON cost_logs (date)"))
+
+
+def downgrade(connection: Connection) -> None:
+    connection.execute(text("DROP INDEX IF EXISTS ix_cost_logs_date"))
+    connection.execute(text("DROP INDEX IF EXISTS ix_cost_logs_service_date"))
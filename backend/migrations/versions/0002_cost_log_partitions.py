@@ -0,0 +1,129 @@
+"""
+Postgres only, opt-in (COST_LOGS_PARTITIONED=true): range-partition cost_logs by month.
+
+Date range queries then only scan the partitions they overlap, and old months can be
+detached or dropped cheaply. Partitions cover the first month with data (or the current
+month) through COST_LOGS_PARTITION_MONTHS_AHEAD months ahead; anything outside lands in
+cost_logs_default. Partitions for later months must be created before rows for them are
+inserted (a partition cannot be added while the default partition holds rows in its range):
+`python -m migrations partitions` (also run on API startup) keeps the window rolling.
+
+The primary key becomes (id, date), as Postgres requires the partition key in unique
+constraints; ids still come from the existing sequence, so they stay unique.
+On other databases (SQLite) the revision is recorded as skipped and the plain indexed table is used.
+"""
+
+import os
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+revision = "0002_cost_log_partitions"
+down_revision = "0001_cost_log_indexes"
+
+COST_LOGS_PARTITIONED = os.getenv("COST_LOGS_PARTITIONED", "false").lower() == "true"
+COST_LOGS_PARTITION_MONTHS_AHEAD = int(os.getenv("COST_LOGS_PARTITION_MONTHS_AHEAD", "12"))
+
+
+def _secondary_indexes(connection: Connection) -> list:
+    """
+    CREATE INDEX statements of cost_logs' current indexes (except the primary key and the
+    plain id index), so the rebuilt table keeps whatever later revisions have added.
+    """
+    rows = connection.execute(text(
+        "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = 'cost_logs'"
+        " AND indexname NOT IN ('cost_logs_pkey', 'ix_cost_logs_id')"
+    ))
+    # Partitioned indexes are reported "ON ONLY <table>"; the rebuilt index must cover all partitions
+    return [row[0].replace(" ON ONLY ", " ON ", 1) for row in rows]
+
+
+def enabled(connection: Connection) -> bool:
+    return COST_LOGS_PARTITIONED and connection.dialect.name == "postgresql"
+
+
+def _add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def create_month_partitions(connection: Connection, first: date, last: date) -> List[str]:
+    """
+    Create the missing monthly partitions of cost_logs for first..last (inclusive, any day
+    in the month). Returns the partitions created.
+    """
+    created = []
+    month = first.replace(day=1)
+    while month <= last:
+        following = _add_months(month, 1)
+        name = f"cost_logs_y{month.year}m{month.month:02d}"
+        if connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is None:
+            connection.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF cost_logs "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+            ))
+            created.append(name)
+        month = following
+    return created
+
+
+def create_upcoming_partitions(connection: Connection, months_ahead: Optional[int] = None) -> List[str]:
+    """Create the missing partitions from the current month through months_ahead (default COST_LOGS_PARTITION_MONTHS_AHEAD)."""
+    today = date.today()
+    months_ahead = COST_LOGS_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    return create_month_partitions(connection, today, _add_months(today, months_ahead))
+
+
+def upgrade(connection: Connection) -> None:
+    first = connection.execute(text("SELECT MIN(date) FROM cost_logs")).scalar() or date.today()
+    first = min(first, date.today())
+    indexes = _secondary_indexes(connection)
+
+    connection.execute(text("ALTER TABLE cost_logs RENAME TO cost_logs_unpartitioned"))
+    # Keep the id sequence when the old table is dropped
+    connection.execute(text("ALTER SEQUENCE cost_logs_id_seq OWNED BY NONE"))
+    connection.execute(text(
+        "CREATE TABLE cost_logs ("
+        " id INTEGER NOT NULL DEFAULT nextval('cost_logs_id_seq'),"
+        " date DATE NOT NULL,"
+        " service VARCHAR NOT NULL,"
+        " amount DOUBLE PRECISION NOT NULL,"
+        " PRIMARY KEY (id, date)"
+        ") PARTITION BY RANGE (date)"
+    ))
+    create_month_partitions(connection, first, _add_months(date.today(), COST_LOGS_PARTITION_MONTHS_AHEAD))
+    connection.execute(text("CREATE TABLE cost_logs_default PARTITION OF cost_logs DEFAULT"))
+
+    connection.execute(text(
+        "INSERT INTO cost_logs (id, date, service, amount) SELECT id, date, service, amount FROM cost_logs_unpartitioned"
+    ))
+    # Drops the old indexes too, freeing their names for the new table
+    connection.execute(text("DROP TABLE cost_logs_unpartitioned"))
+    connection.execute(text("ALTER SEQUENCE cost_logs_id_seq OWNED BY cost_logs.id"))
+    for statement in indexes:
+        connection.execute(text(statement))
+
+
+def downgrade(connection: Connection) -> None:
+    indexes = _secondary_indexes(connection)
+    connection.execute(text("ALTER TABLE cost_logs RENAME TO cost_logs_partitioned"))
+    connection.execute(text("ALTER SEQUENCE cost_logs_id_seq OWNED BY NONE"))
+    connection.execute(text(
+        "CREATE TABLE cost_logs ("
+        " id INTEGER PRIMARY KEY DEFAULT nextval('cost_logs_id_seq'),"
+        " date DATE NOT NULL,"
+        " service VARCHAR NOT NULL,"
+        " amount DOUBLE PRECISION NOT NULL"
+        ")"
+    ))
+    connection.execute(text(
+        "INSERT INTO cost_logs (id, date, service, amount) SELECT id, date, service, amount FROM cost_logs_partitioned"
+    ))
+    # Drops the partitions and their indexes with the parent
+    connection.execute(text("DROP TABLE cost_logs_partitioned"))
+    connection.execute(text("ALTER SEQUENCE cost_logs_id_seq OWNED BY cost_logs.id"))
+    connection.execute(text("CREATE INDEX ix_cost_logs_id ON cost_logs (id)"))
+    for statement in indexes:
+        connection.execute(text(statement))
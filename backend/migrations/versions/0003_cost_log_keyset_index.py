@@ -0,0 +1,23 @@
+"""
+Index cost_logs on (date, id) for /logs keyset pagination.
+
+Pages continue with (date, id) > (last_date, last_id); this index lets that seek straight
+to the first row of the page. It also serves every query ix_cost_logs_date did, so that
+index is dropped.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+revision = "0003_cost_log_keyset_index"
+down_revision = "0002_cost_log_partitions"
+
+
+def upgrade(connection: Connection) -> None:
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_cost_logs_date_id ON cost_logs (date, id)"))
+    connection.execute(text("DROP INDEX IF EXISTS ix_cost_logs_date"))
+
+
+def downgrade(connection: Connection) -> None:
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_cost_logs_date ON cost_logs (date)"))
+    connection.execute(text("DROP INDEX IF EXISTS ix_cost_logs_date_id"))
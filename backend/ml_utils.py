@@ -1,100 +1,714 @@
+import os
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_squared_error
-from typing import List, Dict, Tuple
-from datetime import timedelta
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.decomposition import PCA
+from sklearn.metrics import silhouette_score
+from typing import List, Dict, Tuple, Optional, Union
+from datetime import date
 import warnings
 warnings.filterwarnings('ignore')
-from utils.file_loader import load_mock_cost_data
+from utils.file_loader import load_cost_store, cost_store_for, on_dataset_reload
+from utils.result_cache import ResultCache
+from utils.parallel import COMPUTE_WORKERS, SharedArrays, attach_shared_arrays, get_process_pool
+from utils.cost_store import CostMatrix, CostStore
 
+# Cost data accepted by the analytics below: the shared CostStore (what the routes pass),
+# or a Cost Explorer style dict (converted to a store, cached for the shared dataset)
+CostData = Union[CostStore, Dict]
+
+
+def _cost_store(raw_data: Optional[CostData] = None) -> CostStore:
+    if raw_data is None:
+        return load_cost_store()
+    if isinstance(raw_data, CostStore):
+        return raw_data
+    return cost_store_for(raw_data)
+
+
+# Shared dense cost matrix (rows = dates, columns = services), built once per dataset load
+def get_cost_matrix(raw_data: Optional[CostData] = None) -> CostMatrix:
+    return _cost_store(raw_data).matrix
 
 # Format raw cost data into a Pandas DataFrame
-def preprocess_cost_data(raw_data: Dict) -> pd.DataFrame:
-    records = []
-
-    # Flatten the nested AWS cost format into rows
-    for day in raw_data.get("ResultsByTime", []):
-        date_str = day["TimePeriod"]["Start"]
-        for group in day["Groups"]:
-            service = group["Keys"][0]
-            amount = float(group["Metrics"]["UnblendedCost"]["Amount"])
-            records.append({
-                "date": date_str,
-                "service": service,
-                "amount": amount
-            })
-
-    df = pd.DataFrame(records)
-
-    # Pivot: rows = dates, columns = services, values = amount
-    pivot_df = df.pivot(index="date", columns="service", values="amount").fillna(0)
-    return pivot_df
+def preprocess_cost_data(raw_data: CostData) -> pd.DataFrame:
+    # Pivot: rows = dates, columns = services, values = amount (read-only view of the shared matrix)
+    return get_cost_matrix(raw_data).frame()
 
 # Perform clustering
-def cluster_costs(raw_data: Dict, n_clusters: int = 3) -> Dict:
-    pivot_df = preprocess_cost_data(raw_data)
+# Services from which clustering switches to MiniBatchKMeans in mode="auto"
+CLUSTER_MINIBATCH_MIN_SERVICES = int(os.getenv("CLUSTER_MINIBATCH_MIN_SERVICES", "5000"))
+
+def _warm_start_centers(matrix: CostMatrix, n_clusters: int, mode: str) -> Optional[np.ndarray]:
+    # Centroids of the new service vectors grouped by their cluster in the previous version of
+    # this dataset (matrix.previous, when it was clustered). Works across dataset versions even
+    # though the date axis (the feature space) changes.
+    previous = matrix.previous.derived_cache("clusters").get((n_clusters, mode)) if matrix.previous is not None else None
+    if previous is None:
+        return None
+    by_service = dict(zip(matrix.previous.services, previous["labels"].tolist()))
+    labels = np.array([by_service.get(service, -1) for service in matrix.services])
+    counts = np.bincount(labels[labels >= 0], minlength=n_clusters)
+    if len(counts) != n_clusters or not counts.all():
+        return None
+    centers = np.zeros((n_clusters, matrix.shape[0]))
+    np.add.at(centers, labels[labels >= 0], matrix.values.T[labels >= 0])
+    return centers / counts[:, None]
+
+
+def _canonical_clusters(labels: np.ndarray, centers: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Number clusters in order of their first service, so the same partition gets the same
+    # labels whether the fit was warm-started or not
+    ids, first = np.unique(labels, return_index=True)
+    order = ids[np.argsort(first)]
+    order = np.concatenate([order, np.setdiff1d(np.arange(len(centers)), order)])
+    relabel = np.empty(len(centers), dtype=labels.dtype)
+    relabel[order] = np.arange(len(centers))
+    return relabel[labels], centers[order]
+
+
+def cluster_services(matrix: CostMatrix, n_clusters: int = 3, mode: str = "auto") -> Dict:
+    """
+    KMeans clustering of the services' daily cost vectors, shared by /api/clusters and
+    /api/recommendations.
+
+    Results are cached per dataset version. When the data changes, a full KMeans fit is
+    warm-started from the previous version's clusters (one run instead of n_init=10); it
+    converges to the same partition as a cold fit, and clusters are numbered by their first
+    service, so workers agree on the labels whichever versions they have seen. MiniBatchKMeans
+    always fits cold: its sampled updates settle in different optima from different starts.
+
+    Args:
+        mode: 'full' (KMeans), 'minibatch' (MiniBatchKMeans, for large service populations)
+            or 'auto' (minibatch from CLUSTER_MINIBATCH_MIN_SERVICES services)
+
+    Returns:
+        Dictionary with labels (per service, in matrix.services order), centers, inertia,
+        mode and warm_started
+    """
+    if mode == "auto":
+        mode = "minibatch" if len(matrix.services) >= CLUSTER_MINIBATCH_MIN_SERVICES else "full"
+    if mode not in ("full", "minibatch"):
+        raise ValueError(f"Unknown clustering mode '{mode}'")
+
+    # Keeps a handful of fits per dataset version
+    cache = matrix.derived_cache("clusters")
+    result = cache.get((n_clusters, mode))
+    if result is None:
+        features = matrix.values.T  # rows = service, cols = days
+        centers = _warm_start_centers(matrix, n_clusters, mode) if mode == "full" else None
+        init = {"init": centers, "n_init": 1} if centers is not None else {"n_init": 10}
+        if mode == "minibatch":
+            model = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, batch_size=1024, **init)
+        else:
+            model = KMeans(n_clusters=n_clusters, random_state=42, **init)
+        labels, cluster_centers = _canonical_clusters(model.fit_predict(features), model.cluster_centers_)
+
+        result = {
+            "labels": labels,
+            "centers": cluster_centers,
+            "inertia": float(model.inertia_),
+            "mode": mode,
+            "warm_started": centers is not None
+        }
+        for values in (labels, cluster_centers):
+            values.flags.writeable = False
+        cache.put((n_clusters, mode), result, size=labels.nbytes + cluster_centers.nbytes)
+    return result
+
+
+# Sweeps over at least this many feature cells (services x dimensions) fan out to the process pool
+CLUSTER_SWEEP_PARALLEL_MIN_CELLS = int(os.getenv("CLUSTER_SWEEP_PARALLEL_MIN_CELLS", "1000000"))
+
+
+def _cluster_features(matrix: CostMatrix, normalize: bool, pca_components: Optional[int]) -> np.ndarray:
+    # Services as rows; optionally scaled to unit length (compare cost shape, not size) and PCA-reduced
+    features = matrix.values.T.astype(np.float64)
+    if normalize:
+        norms = np.linalg.norm(features, axis=1, keepdims=True)
+        features = features / np.where(norms > 0, norms, 1)
+    if pca_components and pca_components < min(features.shape):
+        features = PCA(n_components=pca_components, random_state=42).fit_transform(features)
+    return np.ascontiguousarray(features)
+
+
+def _score_cluster_count(features: np.ndarray, k: int, sample_size: int) -> Dict:
+    """Fit one candidate k; inertia plus silhouette on a random sample of services."""
+    if len(features) >= CLUSTER_MINIBATCH_MIN_SERVICES:
+        model = MiniBatchKMeans(n_clusters=k, random_state=42, batch_size=1024, n_init=3)
+    else:
+        model = KMeans(n_clusters=k, random_state=42, n_init=3)
+    labels = model.fit_predict(features)
+
+    try:
+        silhouette = float(silhouette_score(
+            features, labels, sample_size=sample_size if sample_size < len(features) else None, random_state=42
+        ))
+    except ValueError:
+        # Fewer than 2 distinct clusters (in the sample)
+        silhouette = None
+    return {"k": k, "inertia": float(model.inertia_), "silhouette": silhouette, "labels": labels}
+
+
+def _score_cluster_count_shared(spec: Dict, k: int, sample_size: int) -> Dict:
+    # Runs in a worker process, on the features shared by sweep_cluster_counts
+    with attach_shared_arrays(spec) as arrays:
+        return _score_cluster_count(arrays["features"], k, sample_size)
+
+
+def sweep_cluster_counts(
+    matrix: CostMatrix,
+    k_min: int = 2,
+    k_max: int = 10,
+    sample_size: int = 2000,
+    normalize: bool = True,
+    pca_components: Optional[int] = None
+) -> Dict:
+    """
+    Fit KMeans for every k in [k_min, k_max] and score each candidate (cached per dataset version).
+
+    Candidates are independent fits, so large sweeps run across the shared process pool.
+
+    Args:
+        sample_size: Services sampled for the silhouette score (exact silhouette is O(services^2))
+        normalize: Scale each service's daily vector to unit length before clustering
+        pca_components: Reduce the daily vectors to this many principal components first
+
+    Returns:
+        Dictionary with candidates (k, inertia, silhouette, labels), best_k (highest
+        silhouette, None if no candidate could be scored) and the feature dimensions used
+    """
+    # Keeps a handful of sweeps per dataset version
+    cache = matrix.derived_cache("cluster_sweep")
+    key = (k_min, k_max, sample_size, normalize, pca_components)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    features = _cluster_features(matrix, normalize, pca_components)
+    # Silhouette needs 2 <= k <= services - 1
+    ks = list(range(max(k_min, 2), min(k_max, len(features) - 1) + 1))
+
+    pool = get_process_pool() if len(ks) > 1 and features.size >= CLUSTER_SWEEP_PARALLEL_MIN_CELLS else None
+    if pool is None:
+        candidates = [_score_cluster_count(features, k, sample_size) for k in ks]
+    else:
+        with SharedArrays({"features": features}) as shared:
+            futures = [pool.submit(_score_cluster_count_shared, shared.spec, k, sample_size) for k in ks]
+            candidates = [future.result() for future in futures]
+
+    for candidate in candidates:
+        candidate["labels"].flags.writeable = False
+    scored = [c for c in candidates if c["silhouette"] is not None]
+    result = {
+        "candidates": candidates,
+        "best_k": max(scored, key=lambda c: c["silhouette"])["k"] if scored else None,
+        "dimensions": features.shape[1],
+        "normalized": normalize,
+        "pca_components": pca_components if features.shape[1] == pca_components else None
+    }
+    cache.put(key, result, size=sum(c["labels"].nbytes for c in candidates))
+    return result
+
 
-    # Use KMeans clustering on the cost vectors
-    model = KMeans(n_clusters=n_clusters, random_state=42)
-    model.fit(pivot_df.T)  # transpose: services as rows
+SERVICE_VECTOR_FORMATS = ("dict", "compact", "binary")
 
-    labels = model.labels_
+
+def cluster_costs(raw_data: CostData, n_clusters: int = 3, vector_format: str = "dict") -> Dict:
+    """
+    Cluster services by their daily cost vectors.
+
+    Args:
+        vector_format: How service_vectors are returned:
+            - 'dict': {date: {service: cost}} (the original format)
+            - 'compact': {"dates": [...], "values": {service: [cost per date]}}
+            - 'binary': omitted; the caller encodes matrix.service_vectors_binary() itself
+    """
+    if vector_format not in SERVICE_VECTOR_FORMATS:
+        raise ValueError(f"Unknown service vector format '{vector_format}'")
+    matrix = get_cost_matrix(raw_data)
+
+    # Use KMeans clustering on the cost vectors (shared with recommendations)
+    labels = cluster_services(matrix, n_clusters)["labels"]
 
     # Map cluster IDs to services
     cluster_map = {}
-    for service, label in zip(pivot_df.columns, labels):
+    for service, label in zip(matrix.services, labels):
         cluster_map.setdefault(f"Cluster {label}", []).append(service)
 
-    return {
-        "clusters": cluster_map,
-        "service_vectors": pivot_df.T.to_dict()
-    }
+    result = {"clusters": cluster_map}
+    if vector_format == "dict":
+        result["service_vectors"] = matrix.frame().T.to_dict()
+    elif vector_format == "compact":
+        # One shared dates array instead of repeating every date string per service
+        result["service_vectors"] = {
+            "dates": list(matrix.dates),
+            "values": dict(zip(matrix.services, matrix.values.T.tolist()))
+        }
+    return result
+
+# Column-wise z-scores of a (dates x services) matrix in one pass
+def compute_z_scores(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns:
+        (columns, z_scores): indices of the columns with non-zero std, and the
+        (dates x len(columns)) z-score matrix for those columns
+    """
+    if values.shape[0] == 0:
+        return np.empty(0, dtype=np.intp), np.empty((0, 0))
+
+    mean = values.mean(axis=0)
+    std = values.std(axis=0, ddof=1)
+
+    # Avoid division by zero (eg. if all values are the same)
+    columns = np.flatnonzero(std > 0)
+    z_scores = (values[:, columns] - mean[columns]) / std[columns]
+    return columns, z_scores
+
+
+def detect_matrix_anomalies(
+    values: np.ndarray, dates: np.ndarray, services: List[str], z_threshold: float = 2.0
+) -> Dict[str, List[Dict]]:
+    """
+    Z-score anomaly detection on a (dates x services) cost matrix (or any slice of it).
+
+    Returns:
+        A dictionary: service_name -> list of anomaly records (date, amount, z-score)
+    """
+    columns, z_scores = compute_z_scores(values)
+    return _collect_anomalies(values, dates, services, columns, z_scores, z_threshold)
+
+
+def _collect_anomalies(
+    values: np.ndarray, dates: np.ndarray, services: List[str],
+    columns: np.ndarray, z_scores: np.ndarray, z_threshold: float
+) -> Dict[str, List[Dict]]:
+    """Turn a z-score matrix (for values[:, columns]) into per-service anomaly records."""
+    # Find anomalies where |z| >= threshold (transposed so results come out grouped by service)
+    with np.errstate(invalid="ignore"):
+        hit_cols, hit_rows = np.nonzero(np.abs(z_scores.T) >= z_threshold)
+    if len(hit_rows) == 0:
+        return {}
+
+    service_columns = columns[hit_cols]
+    hit_dates = dates[hit_rows].tolist()
+    hit_amounts = values[hit_rows, service_columns].tolist()
+    hit_z = z_scores[hit_rows, hit_cols].tolist()
+
+    # Split the flat hit lists at service boundaries
+    anomalies = {}
+    boundaries = np.flatnonzero(np.diff(service_columns)) + 1
+    for start, end in zip(np.r_[0, boundaries], np.r_[boundaries, len(hit_rows)]):
+        anomalies[services[service_columns[start]]] = [
+            {"date": d, "amount": a, "z_score": round(z, 2)}
+            for d, a, z in zip(hit_dates[start:end], hit_amounts[start:end], hit_z[start:end])
+        ]
+    return anomalies
+
 
 # Detecting anomalies using z-score
-def detect_anomalies(raw_data: Dict, z_threshold: float = 2.0) -> Dict[str, List[Dict]]:
-    # TODO: Add a check to ensure the raw_data is not empty
+def detect_anomalies(
+    raw_data: CostData,
+    z_threshold: float = 2.0,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    service: Optional[str] = None
+) -> Dict[str, List[Dict]]:
     """
     For each AWS service, detect days with anomalous cost behavior.
     Flags both high and low anomalies using z-score method.
 
+    With start_date/end_date/service the statistics are computed over that slice
+    of the shared cost matrix only (no copy for date ranges).
+
     Returns:
         A dictionary: service_name -> list of anomaly records (date, amount, z-score)
     """
-    pivot_df = preprocess_cost_data(raw_data) # rows = dates, columns = services
+    matrix = get_cost_matrix(raw_data) # rows = dates, columns = services
+    rows = matrix.date_range(start_date, end_date)
+    values, dates, services = matrix.values[rows], matrix.dates[rows], matrix.services
+
+    if service is not None:
+        if service not in matrix.services:
+            return {}
+        j = matrix.services.index(service)
+        values, services = values[:, j:j + 1], [service]
+
+        # Only score days on which the service actually has a cost record
+        store = _cost_store(raw_data)
+        present = np.unique(store.day_positions[store.select(start_date, end_date, service)])
+        if len(present) < len(dates):
+            values, dates = matrix.values[present, j:j + 1], matrix.dates[present]
+
+    return detect_matrix_anomalies(values, dates, services, z_threshold)
 
-    anomalies = {}
 
-    for service in pivot_df.columns:
-        values = pivot_df[service]
-        mean = values.mean()
-        std = values.std()
+class RollingAnomalyDetector:
+    """
+    Online z-score detector over a trailing window of daily costs, for many services at once.
+
+    Keeps a ring buffer of the last `window` days plus a running mean and sum of
+    squared deviations per service (Welford's update, extended to drop the oldest
+    day). Scoring or adding a day is O(services) - constant time per service -
+    instead of rescanning the whole history.
+
+    Days are scored only once `min_periods` days (default: a full window) are in
+    the window, and a window whose std is within float residue of zero (relative
+    to its mean) counts as flat: the running m2 never returns exactly to 0 after
+    varying days leave, and the residue would turn a one-cent change into a huge z.
+    """
 
-        # Avoid division by zero (eg. if all values are the same)
-        if std == 0 :
+    # Std below this fraction of |mean| is treated as zero (Welford residue is ~1e-7 of it)
+    FLAT_STD_EPSILON = 1e-6
+
+    def __init__(self, services: List[str], window: int = 30, min_periods: Optional[int] = None):
+        if window < 2:
+            raise ValueError("window must be at least 2")
+        min_periods = window if min_periods is None else min_periods
+        if not 2 <= min_periods <= window:
+            raise ValueError("min_periods must be between 2 and window")
+        self.services = list(services)
+        self.window = window
+        self.min_periods = min_periods
+        self.buffer = np.zeros((window, len(self.services)))
+        self.count = 0       # days currently in the window (<= window)
+        self.position = 0    # ring buffer slot for the next day
+        self.mean = np.zeros(len(self.services))
+        self.m2 = np.zeros(len(self.services))
+
+    def score(self, day_values: np.ndarray) -> np.ndarray:
+        """Z-scores of one day's costs against the current window (NaN until min_periods days / flat window)."""
+        if self.count < self.min_periods:
+            return np.full(len(self.services), np.nan)
+        std = np.sqrt(np.maximum(self.m2, 0) / (self.count - 1))
+        flat = std <= self.FLAT_STD_EPSILON * np.abs(self.mean)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where((std > 0) & ~flat, (day_values - self.mean) / std, np.nan)
+
+    def update(self, day_values: np.ndarray) -> np.ndarray:
+        """Score one day's costs, then add them to the window. Returns the z-scores."""
+        day_values = np.asarray(day_values, dtype=np.float64)
+        z_scores = self.score(day_values)
+
+        if self.count < self.window:
+            self.count += 1
+            delta = day_values - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (day_values - self.mean)
+        else:
+            # Replace the oldest day: remove it and add the new one in a single update
+            oldest = self.buffer[self.position]
+            new_mean = self.mean + (day_values - oldest) / self.count
+            self.m2 += (day_values - oldest) * (day_values - new_mean + oldest - self.mean)
+            self.mean = new_mean
+
+        self.buffer[self.position] = day_values
+        self.position = (self.position + 1) % self.window
+        return z_scores
+
+
+def rolling_z_scores(raw_data: CostData, window: int = 30) -> Tuple[RollingAnomalyDetector, np.ndarray]:
+    """
+    Feed the cost history through a RollingAnomalyDetector (cached per dataset version and window).
+
+    After a reload the previous version's z-scores are reused up to the first day that
+    changed (all of them when days were only appended); the detector is positioned by
+    replaying the `window` days before it, so only the new days are scored.
+
+    Returns:
+        (detector, z_scores): the detector positioned after the last day, ready to
+        score new days, and the (dates x services) trailing-window z-scores
+    """
+    matrix = get_cost_matrix(raw_data)
+    # Keeps a handful of windows per dataset version
+    cache = matrix.derived_cache("rolling")
+    cached = cache.get(window)
+    if cached is None:
+        z_scores = np.empty(matrix.shape)
+        reuse = 0
+        previous = matrix.previous.derived_cache("rolling").get(window) if matrix.previous is not None else None
+        if previous is not None:
+            reuse = matrix.unchanged_rows(matrix.previous)
+            z_scores[:reuse] = previous[1][:reuse]
+
+        detector = RollingAnomalyDetector(matrix.services, window)
+        for day_values in matrix.values[max(reuse - window, 0):reuse]:
+            detector.update(day_values)
+        for i in range(reuse, len(matrix.values)):
+            z_scores[i] = detector.update(matrix.values[i])
+        cached = (detector, z_scores)
+        cache.put(window, cached, size=z_scores.nbytes + detector.buffer.nbytes)
+    return cached
+
+
+def detect_rolling_anomalies(
+    raw_data: CostData,
+    z_threshold: float = 2.0,
+    window: int = 30,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    service: Optional[str] = None
+) -> Dict[str, List[Dict]]:
+    """
+    Like detect_anomalies, but each day is scored against the `window` days before it
+    instead of the global mean/std of the whole history.
+
+    Returns:
+        A dictionary: service_name -> list of anomaly records (date, amount, z-score)
+    """
+    matrix = get_cost_matrix(raw_data)
+    _, z_scores = rolling_z_scores(raw_data, window)
+
+    rows = matrix.date_range(start_date, end_date)
+    columns = np.arange(len(matrix.services))
+    if service is not None:
+        if service not in matrix.services:
+            return {}
+        columns = np.array([matrix.services.index(service)])
+
+    return _collect_anomalies(
+        matrix.values[rows], matrix.dates[rows], matrix.services, columns, z_scores[rows][:, columns], z_threshold
+    )
+
+
+def summarize_anomaly_thresholds(raw_data: CostData, thresholds: List[float]) -> Dict[str, Dict]:
+    """
+    Anomaly counts for many z-score thresholds from a single z-score computation.
+
+    |z| is sorted once per service; the count of days with |z| >= t is then a
+    binary search, so the cost barely depends on how many thresholds are asked for.
+
+    Returns:
+        A dictionary: "threshold_<t>" -> {total_anomalies, services_affected, services}
+    """
+    matrix = get_cost_matrix(raw_data)
+    columns, z_scores = compute_z_scores(matrix.values)
+    sorted_abs_z = np.sort(np.abs(z_scores), axis=0)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+
+    # counts[i, j] = number of days where |z| of service j >= thresholds[i]
+    n_days = sorted_abs_z.shape[0]
+    counts = np.empty((len(thresholds), len(columns)), dtype=np.int64)
+    for j in range(len(columns)):
+        counts[:, j] = n_days - np.searchsorted(sorted_abs_z[:, j], thresholds, side="left")
+
+    summary = {}
+    for threshold, row in zip(thresholds.tolist(), counts):
+        affected = columns[row > 0]
+        summary[f"threshold_{threshold}"] = {
+            "total_anomalies": int(row.sum()),
+            "services_affected": len(affected),
+            "services": [matrix.services[j] for j in affected]
+        }
+    return summary
+
+
+def _is_weekend(day_numbers: np.ndarray) -> np.ndarray:
+    # 1970-01-01 (day 0) was a Thursday, so (day + 3) % 7 gives 0=Monday ... 6=Sunday
+    return ((day_numbers + 3) % 7 >= 5).astype(np.float64)
+
+
+def fit_service_trends(
+    day_numbers: np.ndarray, service_codes: np.ndarray, amounts: np.ndarray, n_services: int
+) -> Dict[str, np.ndarray]:
+    """
+    Fit the per-service linear trend model (cost ~ day_number + is_weekend) for all services at once.
+
+    Daily costs are summed into a (days x services) matrix; services that share the
+    same set of dates (normally all of them) are solved together as one multi-target
+    least-squares problem on a shared design matrix. X and y are centered first,
+    exactly like sklearn's LinearRegression, so coefficients match a per-service fit.
+
+    Returns:
+        Dictionary of arrays, one entry per fitted service (services with < 3 days are skipped):
+        service_codes, coef (k x 2), intercept, std_error, first_day, last_day
+    """
+    # Distinct days (day numbers are a compact integer range, so no sort is needed)
+    first = day_numbers.min() if len(day_numbers) else 0
+    offsets = day_numbers - first
+    has_data = np.zeros(offsets.max() + 1 if len(offsets) else 0, dtype=bool)
+    has_data[offsets] = True
+    days = np.flatnonzero(has_data) + first
+    day_positions = (np.cumsum(has_data) - 1)[offsets]
+
+    daily = np.zeros((len(days), n_services))
+    present = np.zeros((len(days), n_services), dtype=bool)
+    np.add.at(daily, (day_positions, service_codes), amounts)
+    present[day_positions, service_codes] = True
+
+    fitted = {name: [] for name in ("service_codes", "coef", "intercept", "std_error", "first_day", "last_day")}
+
+    # Group services by their pattern of dates with data (usually one group: every service every day)
+    if present.all():
+        group_of_service = np.zeros(n_services, dtype=np.intp)
+    else:
+        group_of_service = np.unique(np.packbits(present.T, axis=1), axis=0, return_inverse=True)[1].ravel()
+    for g in range(group_of_service.max() + 1 if n_services else 0):
+        group = np.flatnonzero(group_of_service == g)
+        rows = np.flatnonzero(present[:, group[0]])
+
+        # Skip if not enough data points
+        if len(rows) < 3:
             continue
 
-        z_scores = (values - mean) / std
+        # Features: day number (since the service's first day) and basic seasonality
+        X = np.column_stack([days[rows] - days[rows[0]], _is_weekend(days[rows])]).astype(np.float64)
+        Y = daily[np.ix_(rows, group)]
+
+        X_offset, Y_offset = X.mean(axis=0), Y.mean(axis=0)
+        coef = np.linalg.lstsq(X - X_offset, Y - Y_offset, rcond=None)[0].T  # (k x 2)
+        intercept = Y_offset - coef @ X_offset
+
+        # Residual standard error, used for the confidence interval
+        residuals = Y - (X @ coef.T + intercept)
+        std_error = np.sqrt(np.mean(residuals ** 2, axis=0))
+
+        fitted["service_codes"].append(group)
+        fitted["coef"].append(coef)
+        fitted["intercept"].append(intercept)
+        fitted["std_error"].append(std_error)
+        fitted["first_day"].append(np.full(len(group), days[rows[0]]))
+        fitted["last_day"].append(np.full(len(group), days[rows[-1]]))
+
+    if not fitted["service_codes"]:
+        return {
+            "service_codes": np.empty(0, dtype=np.intp), "coef": np.empty((0, 2)), "intercept": np.empty(0),
+            "std_error": np.empty(0), "first_day": np.empty(0, dtype=np.int64), "last_day": np.empty(0, dtype=np.int64)
+        }
 
-        # Print the z-scores for each service (todo: remove this later{just for checking})
-        # print("\nSample Z-Scores Table:\n")
-        # print(f"\nZ-Scores for {service}:")
-        # for date, z in z_scores.items():
-        #    print(f"{date}: z-score = {z:.2f}")
-        # print()  
+    fitted = {name: np.concatenate(parts) for name, parts in fitted.items()}
+    # Keep services in code (first-seen) order
+    order = np.argsort(fitted["service_codes"], kind="stable")
+    return {name: values[order] for name, values in fitted.items()}
 
 
-        # Find anomalies where |z| > threshold
-        for date, z in z_scores.items():
-            if abs(z) >= z_threshold:
-                anomalies.setdefault(service, []).append({
-                    "date": date,
-                    "amount": float(pivot_df.loc[date, service]),
-                    "z_score": round(float(z), 2)
-                })
+def predict_service_trends(fit: Dict[str, np.ndarray], n_days: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Predict the next n_days for every fitted service in one matrix operation.
 
-    return anomalies
+    Returns:
+        (future_days, predictions): both (services x n_days); future_days are days since 1970-01-01
+    """
+    steps = np.arange(1, n_days + 1)
+    future_days = fit["last_day"][:, None] + steps
+    features = np.stack([future_days - fit["first_day"][:, None], _is_weekend(future_days)], axis=-1)
+    predictions = np.einsum("kdf,kf->kd", features, fit["coef"]) + fit["intercept"][:, None]
+    return future_days, predictions
+
+
+# Per-service model fitters: (day_numbers, service_codes, amounts, n_services) -> fit arrays.
+# Each service is fitted independently, so services can be split across worker processes.
+FORECAST_MODELS = {"linear": fit_service_trends}
+
+# Process pool fan-out for model fitting; smaller inputs are fitted in this process
+FORECAST_PARALLEL_MIN_ROWS = int(os.getenv("FORECAST_PARALLEL_MIN_ROWS", "500000"))
+FORECAST_CHUNKS_PER_WORKER = int(os.getenv("FORECAST_CHUNKS_PER_WORKER", "4"))
+
+
+def fit_forecast_model(
+    day_numbers: np.ndarray, service_codes: np.ndarray, amounts: np.ndarray, n_services: int,
+    model: str = "linear", parallel: Optional[bool] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Fit a forecast model for every service, in this process or across the shared process pool.
+
+    Args:
+        parallel: Force (True) or disable (False) the process pool; by default it is used
+            for inputs of at least FORECAST_PARALLEL_MIN_ROWS rows when COMPUTE_WORKERS > 1
+
+    Returns:
+        Fit arrays in service code order, as returned by the model's fitter
+    """
+    if parallel is None:
+        parallel = len(amounts) >= FORECAST_PARALLEL_MIN_ROWS
+    pool = get_process_pool() if parallel and n_services > 1 else None
+    if pool is None:
+        return FORECAST_MODELS[model](day_numbers, service_codes, amounts, n_services)
+
+    # Group rows by service so each chunk is one contiguous slice of the shared arrays
+    order = np.argsort(service_codes, kind="stable")
+    row_offsets = np.concatenate([[0], np.cumsum(np.bincount(service_codes, minlength=n_services))])
+
+    # Split services into contiguous code ranges holding roughly equal numbers of rows
+    n_chunks = min(n_services, COMPUTE_WORKERS * FORECAST_CHUNKS_PER_WORKER)
+    targets = np.linspace(0, len(order), n_chunks + 1)[1:-1]
+    bounds = np.unique(np.concatenate([[0], np.searchsorted(row_offsets[1:], targets, side="right"), [n_services]]))
+
+    columns = {"days": day_numbers[order], "codes": service_codes[order], "amounts": amounts[order]}
+    with SharedArrays(columns) as shared:
+        futures = [
+            pool.submit(
+                _fit_service_chunk, shared.spec, model,
+                (int(row_offsets[start]), int(row_offsets[end])), (int(start), int(end))
+            )
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+        parts = [future.result() for future in futures]
+
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+def _fit_service_chunk(spec: Dict, model: str, rows: Tuple[int, int], codes: Tuple[int, int]) -> Dict[str, np.ndarray]:
+    # Runs in a worker process: fit services [codes[0], codes[1]) from their rows of the shared arrays
+    with attach_shared_arrays(spec) as columns:
+        selected = slice(*rows)
+        fit = FORECAST_MODELS[model](
+            columns["days"][selected], columns["codes"][selected] - codes[0], columns["amounts"][selected],
+            codes[1] - codes[0]
+        )
+    fit["service_codes"] = fit["service_codes"] + codes[0]
+    return fit
+
+
+# Rough memory cost of one forecast point (dict + date string + floats), for the cache size cap
+_FORECAST_POINT_BYTES = 400
+
+# Forecast cache: fitted coefficients and finished results, keyed by dataset fingerprint
+_forecast_cache = ResultCache(
+    max_entries=int(os.getenv("FORECAST_CACHE_MAX_ENTRIES", "256")),
+    max_bytes=int(os.getenv("FORECAST_CACHE_MAX_MB", "64")) * 1024 * 1024
+)
+on_dataset_reload(lambda old_version: _forecast_cache.invalidate(lambda key: key[1] == old_version))
+
+
+def get_forecast_cache_stats() -> Dict:
+    return _forecast_cache.stats()
+
+
+def _fit_cost_store(store: CostStore, service: Optional[str], model: str) -> Tuple[Dict[str, np.ndarray], List[str]]:
+    """Fitted model coefficients for a store (cached), plus the service names indexed by fit codes."""
+    key = ("fit", store.fingerprint, service, model)
+    cached = _forecast_cache.get(key)
+    if cached is None:
+        rows = store.select(service=service) if service else np.arange(len(store))
+        codes, uniques = pd.factorize(store.service_codes[rows], sort=False)
+        services = [store.services[code] for code in uniques]
+        fit = fit_forecast_model(store.date_ordinals[rows], codes, store.amounts[rows], len(services), model)
+        cached = (fit, services)
+        _forecast_cache.put(key, cached, size=sum(a.nbytes for a in fit.values()) + 100 * len(services))
+    return cached
+
+
+def forecast_cost_store(store: CostStore, n_days: int = 7, service: Optional[str] = None, model: str = "linear") -> Dict:
+    """
+    forecast_costs for a CostStore (optionally a single service), without building record dicts.
+
+    Results are cached per (dataset fingerprint, n_days, service, model), and the fitted
+    coefficients separately, so a new horizon on unchanged data only needs predictions.
+    Cached results are shared: the returned dict is a shallow copy, nested lists must
+    not be modified.
+    """
+    if model not in FORECAST_MODELS:
+        raise ValueError(f"Unknown forecast model '{model}'")
+
+    service = service or None
+    key = ("forecast", store.fingerprint, n_days, service, model)
+    result = _forecast_cache.get(key)
+    if result is None:
+        fit, services = _fit_cost_store(store, service, model)
+        result = _forecast_from_fit(fit, services, n_days)
+        _forecast_cache.put(key, result, size=_FORECAST_POINT_BYTES * (len(services) + 1) * n_days)
+    return dict(result)
 
 
 def forecast_costs(data: List[Dict], n_days: int = 7) -> Dict[str, List[Dict]]:
@@ -112,103 +726,73 @@ def forecast_costs(data: List[Dict], n_days: int = 7) -> Dict[str, List[Dict]]:
         - summary: Forecast summary statistics
     """
     
-    # Convert raw data to DataFrame
-    df = pd.DataFrame(data)
-    df['date'] = pd.to_datetime(df['date'])
-    
-    # Get unique services
-    services = df['service'].unique()
-    
+    # Convert raw data to columns (service codes in first-seen order)
+    df = pd.DataFrame(data, columns=["date", "service", "amount"])
+    day_numbers = pd.to_datetime(df['date']).to_numpy().astype("datetime64[D]").astype(np.int64)
+    codes, services = pd.factorize(df['service'], sort=False)
+
+    # Fit every service (batched solve; large inputs are split across worker processes)
+    fit = fit_forecast_model(day_numbers, codes, df['amount'].to_numpy(dtype=np.float64), len(services))
+    return _forecast_from_fit(fit, list(services), n_days)
+
+
+def _forecast_from_fit(fit: Dict[str, np.ndarray], services: List[str], n_days: int) -> Dict:
+    # Predict all future points of all services in one shot
+    future_days, predictions = predict_service_trends(fit, n_days)
+
+    # Confidence interval (±1.96 * std_error for 95% confidence)
+    confidence_interval = 1.96 * fit["std_error"][:, None] * np.ones_like(predictions)
+    predicted = np.round(predictions, 2)
+    lower = np.round(np.maximum(0, predictions - confidence_interval), 2)
+    upper = np.round(predictions + confidence_interval, 2)
+
+    dates = np.datetime_as_string(future_days.astype("datetime64[D]")).tolist()
     service_forecasts = {}
-    total_predictions = []
-    
-    # Forecast each service individually
-    for service in services:
-        service_data = df[df['service'] == service].copy()
-        
-        # Group by date and sum (in case multiple records per day)
-        daily_costs = service_data.groupby('date')['amount'].sum().reset_index()
-        daily_costs = daily_costs.sort_values('date')
-        
-        # Skip if not enough data points
-        if len(daily_costs) < 3:
-            continue
-            
-        # Create features: day number and basic seasonality
-        daily_costs['day_number'] = (daily_costs['date'] - daily_costs['date'].min()).dt.days
-        daily_costs['day_of_week'] = daily_costs['date'].dt.dayofweek  # 0=Monday, 6=Sunday
-        daily_costs['is_weekend'] = (daily_costs['day_of_week'] >= 5).astype(int)
-        
-        # Prepare features
-        X = daily_costs[['day_number', 'is_weekend']]
-        y = daily_costs['amount']
-        
-        # Train model
-        model = LinearRegression()
-        model.fit(X, y)
-        
-        # Calculate confidence intervals using cross-validation
-        predictions = model.predict(X)
-        mse = mean_squared_error(y, predictions)
-        std_error = np.sqrt(mse)
-        
-        # Generate future predictions
-        last_date = daily_costs['date'].max()
-        last_day = daily_costs['day_number'].max()
-        
-        future_predictions = []
-        for i in range(1, n_days + 1):
-            future_date = last_date + timedelta(days=i)
-            future_day = last_day + i
-            future_is_weekend = 1 if future_date.weekday() >= 5 else 0
-            
-            # Predict
-            pred = model.predict([[future_day, future_is_weekend]])[0]
-            
-            # Confidence interval (±1.96 * std_error for 95% confidence)
-            confidence_interval = 1.96 * std_error
-            
-            future_predictions.append({
-                "date": future_date.strftime("%Y-%m-%d"),
-                "predicted_cost": round(pred, 2),
-                "confidence_lower": round(max(0, pred - confidence_interval), 2),
-                "confidence_upper": round(pred + confidence_interval, 2),
-                "confidence_interval": round(confidence_interval, 2)
-            })
-        
-        service_forecasts[service] = future_predictions
-    
-    # Calculate total forecast by summing all services
-    if service_forecasts:
-        # Get all future dates
-        all_dates = set()
-        for service_preds in service_forecasts.values():
-            for pred in service_preds:
-                all_dates.add(pred['date'])
-        
-        all_dates = sorted(list(all_dates))
-        
-        for date in all_dates:
-            total_pred = 0
-            total_lower = 0
-            total_upper = 0
-            
-            for service_preds in service_forecasts.values():
-                for pred in service_preds:
-                    if pred['date'] == date:
-                        total_pred += pred['predicted_cost']
-                        total_lower += pred['confidence_lower']
-                        total_upper += pred['confidence_upper']
-                        break
-            
-            total_predictions.append({
-                "date": date,
-                "predicted_cost": round(total_pred, 2),
-                "confidence_lower": round(total_lower, 2),
-                "confidence_upper": round(total_upper, 2),
-                "confidence_interval": round((total_upper - total_lower) / 2, 2)
-            })
-    
+    for k, code in enumerate(fit["service_codes"].tolist()):
+        service_forecasts[services[code]] = [
+            {
+                "date": d,
+                "predicted_cost": p,
+                "confidence_lower": lo,
+                "confidence_upper": up,
+                "confidence_interval": ci
+            }
+            for d, p, lo, up, ci in zip(
+                dates[k], predicted[k].tolist(), lower[k].tolist(), upper[k].tolist(),
+                np.round(confidence_interval[k], 2).tolist()
+            )
+        ]
+
+    # Total forecast: sum the rounded service values per date over a (services x dates) grid.
+    # Services whose history ends earlier cover other dates, so place each row at its dates
+    # in the union; missing cells stay 0 and the row-by-row sum keeps the old accumulation order.
+    total_days = np.unique(future_days)
+    columns = np.searchsorted(total_days, future_days)
+    rows = np.arange(len(future_days))[:, None]
+    totals = []
+    for values in (predicted, lower, upper):
+        grid = np.zeros((len(future_days), len(total_days)))
+        grid[rows, columns] = values
+        totals.append(grid.sum(axis=0))
+    total_pred, total_lower, total_upper = totals
+
+    total_predictions = [
+        {
+            "date": d,
+            "predicted_cost": p,
+            "confidence_lower": lo,
+            "confidence_upper": up,
+            "confidence_interval": ci
+        }
+        for d, p, lo, up, ci in zip(
+            np.datetime_as_string(total_days.astype("datetime64[D]")).tolist(),
+            np.round(total_pred, 2).tolist(),
+            np.round(total_lower, 2).tolist(),
+            np.round(total_upper, 2).tolist(),
+            np.round((total_upper - total_lower) / 2, 2).tolist()
+        )
+    ]
+
     # Calculate summary statistics
     if total_predictions:
         total_forecast_cost = sum(pred['predicted_cost'] for pred in total_predictions)
@@ -237,36 +821,22 @@ def forecast_costs(data: List[Dict], n_days: int = 7) -> Dict[str, List[Dict]]:
     }
 
 def generate_recommendations(max_budget: float = None, n_clusters: int = 3) -> dict:
-    # Load AWS-style mock data and flatten to a tabular format
-    raw_data = load_mock_cost_data()
-    records = []
-    for day in raw_data.get("ResultsByTime", []):
-        date_str = day["TimePeriod"]["Start"]
-        for group in day.get("Groups", []):
-            service = group["Keys"][0]
-            amount = float(group["Metrics"]["UnblendedCost"]["Amount"])
-            records.append({"date": date_str, "service": service, "amount": amount})
-
-    df = pd.DataFrame(records)
-
-    # Pivot Data (rows = date, columns = service, values = cost)
-    pivot = df.pivot(index="date", columns="service", values="amount").fillna(0)
+    # Shared cost matrix of the current dataset (rows = date, columns = service, values = cost)
+    matrix = get_cost_matrix()
 
     # Compute total cost per service
-    total_costs = pivot.sum().sort_values(ascending=False)
+    total_costs = pd.Series(matrix.values.sum(axis=0), index=matrix.services).sort_values(ascending=False)
 
     # Anomaly Detection
     z_scores = (total_costs - total_costs.mean()) / total_costs.std()
     anomalies = z_scores[z_scores > 1.4].index.tolist()
 
     # Clustering
-    service_features = pivot.T  # rows = service, cols = days
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-    cluster_labels = kmeans.fit_predict(service_features)
+    cluster_labels = cluster_services(matrix, n_clusters)["labels"]
 
     # Build recommendations 
     recommendations = []
-    for i, service in enumerate(service_features.index):
+    for i, service in enumerate(matrix.services):
         service_total = total_costs[service]
         is_anomalous = service in anomalies
         cluster = int(cluster_labels[i])
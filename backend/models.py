@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Date, Float, Boolean, DateTime
+from sqlalchemy import Column, String, Integer, Date, Float, Boolean, DateTime, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -13,6 +13,13 @@ class CostLog(Base):
     service = Column(String, nullable=False)
     amount = Column(Float, nullable=False)
 
+    # Range queries by date, optionally for one service, and /logs keyset pages by (date, id)
+    # (see migrations/versions/0001 and 0003)
+    __table_args__ = (
+        Index("ix_cost_logs_service_date", "service", "date"),
+        Index("ix_cost_logs_date_id", "date", "id"),
+    )
+
 class User(Base):
     __tablename__ = "users"
 
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, HTTPException, Query
+import math
 from typing import Dict, List, Any, Optional
 from datetime import date
-from utils.file_loader import load_cost_data, load_cost_data_flat, get_data_source_info
-from ml_utils import detect_anomalies
+from utils.file_loader import load_cost_store, get_data_source_info
+from ml_utils import detect_anomalies, detect_rolling_anomalies, summarize_anomaly_thresholds
+from utils.compute import run_compute
+from utils.responses import trusted_response
 from schemas import AnomalyResponse, AnomalySummaryResponse
-import pandas as pd
 
 router = APIRouter()
 
@@ -14,7 +16,9 @@ async def get_anomalies(
     source: Optional[str] = Query(None, description="Data source: 'mock', 'real', or None for auto-detect"),
     start_date: Optional[date] = Query(None, description="Start date filter (YYYY-MM-DD)"),
     end_date: Optional[date] = Query(None, description="End date filter (YYYY-MM-DD)"),
-    service: Optional[str] = Query(None, description="Filter by specific service")
+    service: Optional[str] = Query(None, description="Filter by specific service"),
+    mode: str = Query("global", pattern="^(global|rolling)$", description="global: z-score vs whole history, rolling: vs trailing window"),
+    window: int = Query(30, ge=2, le=365, description="Trailing window in days for mode=rolling")
 ):
     """
     Detect anomalies in AWS cost data using z-score method.
@@ -25,6 +29,8 @@ async def get_anomalies(
         start_date: Optional start date filter (YYYY-MM-DD)
         end_date: Optional end date filter (YYYY-MM-DD)
         service: Optional service filter
+        mode: 'global' (mean/std of the whole history) or 'rolling' (each day vs the previous `window` days)
+        window: Trailing window size in days for rolling mode (default=30)
         
     Returns:
         Dictionary containing:
@@ -33,54 +39,29 @@ async def get_anomalies(
         - threshold_used: The z-threshold used for detection
     """
     try:
-        # Load cost data from specified source or auto-detect
-        if start_date or end_date or service:
-            # Use flat data format for filtering
-            df = load_cost_data_flat(source)
-            
-            # Apply date filters
-            if start_date:
-                df = df[df['date'] >= pd.to_datetime(start_date)]
-            if end_date:
-                df = df[df['date'] <= pd.to_datetime(end_date)]
-            if service:
-                df = df[df['service'] == service]
-            
-            # Convert back to the format expected by detect_anomalies
-            data = {"ResultsByTime": []}
-            for _, row in df.iterrows():
-                date_str = row['date'].strftime('%Y-%m-%d')
-                
-                # Find or create the day entry
-                day_entry = None
-                for day in data["ResultsByTime"]:
-                    if day["TimePeriod"]["Start"] == date_str:
-                        day_entry = day
-                        break
-                
-                if not day_entry:
-                    day_entry = {
-                        "TimePeriod": {"Start": date_str, "End": date_str},
-                        "Groups": []
-                    }
-                    data["ResultsByTime"].append(day_entry)
-                
-                # Add the service group
-                day_entry["Groups"].append({
-                    "Keys": [row['service']],
-                    "Metrics": {
-                        "UnblendedCost": {
-                            "Amount": str(row['amount']),
-                            "Unit": "USD"
-                        }
-                    }
-                })
-        else:
-            # Use original method for full dataset
-            data = load_cost_data(source)
-        
-        # Detect anomalies
-        anomalies = detect_anomalies(data, z_threshold=z_threshold)
+        def detect():
+            # Load cost data from specified source or auto-detect (off the event loop: a reload parses the file)
+            data = load_cost_store(source)
+
+            # Detect anomalies (filters slice the shared cost matrix directly)
+            if mode == "rolling":
+                return detect_rolling_anomalies(
+                    data,
+                    z_threshold=z_threshold,
+                    window=window,
+                    start_date=start_date,
+                    end_date=end_date,
+                    service=service or None
+                )
+            return detect_anomalies(
+                data,
+                z_threshold=z_threshold,
+                start_date=start_date,
+                end_date=end_date,
+                service=service or None
+            )
+
+        anomalies = await run_compute(detect)
         
         # Calculate summary statistics
         total_anomalies = sum(len(points) for points in anomalies.values())
@@ -100,7 +81,7 @@ async def get_anomalies(
         # Add data source info to response
         data_source_info = get_data_source_info()
         
-        return {
+        return trusted_response({
             "anomalies": anomalies,
             "flattened_anomalies": flattened_anomalies,
             "summary": {
@@ -109,37 +90,52 @@ async def get_anomalies(
                 "services": list(anomalies.keys())
             },
             "threshold_used": z_threshold,
+            "mode": mode,
+            "window": window if mode == "rolling" else None,
             "data_source": data_source_info["current_source"],
             "data_source_info": data_source_info,
             "status": "success"
-        }
+        }, AnomalyResponse)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error detecting anomalies: {str(e)}")
 
+DEFAULT_SUMMARY_THRESHOLDS = [0.5, 1.0, 1.5, 2.0, 2.5]
+MAX_SUMMARY_THRESHOLDS = 100
+
 @router.get("/anomalies/summary", response_model=AnomalySummaryResponse)
-async def get_anomalies_summary():
+async def get_anomalies_summary(
+    thresholds: Optional[str] = Query(None, description="Comma-separated z-score thresholds, e.g. 0.5,1,1.5 (default: 0.5,1.0,1.5,2.0,2.5)")
+):
     """
     Get a summary of anomalies across different threshold levels.
+
+    Z-scores are computed once and every threshold is answered from them, so
+    asking for more thresholds costs (almost) nothing extra.
     """
     try:
-        data = load_cost_data()
-        thresholds = [0.5, 1.0, 1.5, 2.0, 2.5]
-        
-        summary = {}
-        for threshold in thresholds:
-            anomalies = detect_anomalies(data, z_threshold=threshold)
-            total_anomalies = sum(len(points) for points in anomalies.values())
-            summary[f"threshold_{threshold}"] = {
-                "total_anomalies": total_anomalies,
-                "services_affected": len(anomalies),
-                "services": list(anomalies.keys())
-            }
+        if thresholds:
+            try:
+                threshold_list = [float(t) for t in thresholds.split(",") if t.strip()]
+            except ValueError:
+                raise HTTPException(status_code=400, detail="thresholds must be a comma-separated list of numbers")
+            if not all(math.isfinite(t) for t in threshold_list):
+                raise HTTPException(status_code=400, detail="thresholds must be a comma-separated list of numbers")
+            if not threshold_list or len(threshold_list) > MAX_SUMMARY_THRESHOLDS:
+                raise HTTPException(status_code=400, detail=f"Provide between 1 and {MAX_SUMMARY_THRESHOLDS} thresholds")
+        else:
+            threshold_list = DEFAULT_SUMMARY_THRESHOLDS
+
+        summary = await run_compute(lambda: summarize_anomaly_thresholds(load_cost_store(), threshold_list))
         
-        return {
+        return trusted_response({
             "threshold_summary": summary,
             "status": "success"
-        }
+        }, AnomalySummaryResponse)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating summary: {str(e)}")
@@ -1,30 +1,105 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Query, Response
 from pathlib import Path
 import json
-from ml_utils import cluster_costs
-from utils.file_loader import load_cost_data, get_data_source_info
+from ml_utils import cluster_costs, sweep_cluster_counts
+from utils.file_loader import load_cost_store, get_data_source_info
+from utils.responses import trusted_response
 from typing import Optional
 
 router = APIRouter()
 
 @router.get("/clusters")
-def get_clusters(source: Optional[str] = Query(None, description="Data source: 'mock', 'real', or None for auto-detect")):
+def get_clusters(
+    source: Optional[str] = Query(None, description="Data source: 'mock', 'real', or None for auto-detect"),
+    format: Optional[str] = Query(None, pattern="^(dict|compact|binary)$", description="service_vectors format (default: from Accept header, else dict)"),
+    accept: Optional[str] = Header(None)
+):
     """
     Get cost clustering analysis from specified data source.
     
     Args:
         source: Optional data source override ('mock', 'real', or None for auto-detect)
+        format: service_vectors format:
+            - dict: {date: {service: cost}} (default)
+            - compact: {"dates": [...], "values": {service: [cost per date]}}
+            - binary: application/octet-stream body (see CostMatrix.service_vectors_binary);
+              clusters and data source info are in its JSON header.
+              Also selected by `Accept: application/octet-stream`.
     """
     try:
+        if format is None:
+            format = "binary" if accept and "application/octet-stream" in accept else "dict"
+
         # Load cost data from specified source or auto-detect
-        raw_data = load_cost_data(source)
-        result = cluster_costs(raw_data)
+        store = load_cost_store(source)
+        result = cluster_costs(store, vector_format=format)
         
         # Add data source info to response
         data_source_info = get_data_source_info()
         result["data_source"] = data_source_info["current_source"]
         result["data_source_info"] = data_source_info
-        
-        return result
+
+        if format == "binary":
+            return Response(
+                content=store.matrix.service_vectors_binary(result),
+                media_type="application/octet-stream"
+            )
+        return trusted_response(result)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/clusters/auto")
+def get_clusters_auto(
+    k_min: int = Query(2, ge=2, le=50, description="Smallest cluster count to try"),
+    k_max: int = Query(10, ge=2, le=50, description="Largest cluster count to try"),
+    sample_size: int = Query(2000, ge=50, le=20000, description="Services sampled for the silhouette score"),
+    normalize: bool = Query(True, description="Cluster by cost shape (unit-length daily vectors)"),
+    pca_components: Optional[int] = Query(None, ge=1, le=500, description="Reduce daily vectors with PCA first"),
+    source: Optional[str] = Query(None, description="Data source: 'mock', 'real', or None for auto-detect")
+):
+    """
+    Pick the number of clusters automatically.
+
+    Fits every k in [k_min, k_max], scores each with inertia (elbow) and silhouette,
+    and returns the clusters for the k with the best silhouette score.
+    """
+    try:
+        if k_min > k_max:
+            raise HTTPException(status_code=400, detail="k_min must not be greater than k_max")
+
+        matrix = load_cost_store(source).matrix
+        sweep = sweep_cluster_counts(
+            matrix, k_min=k_min, k_max=k_max, sample_size=sample_size,
+            normalize=normalize, pca_components=pca_components
+        )
+
+        # Map cluster IDs to services for the best k
+        cluster_map = {}
+        best = next((c for c in sweep["candidates"] if c["k"] == sweep["best_k"]), None)
+        if best is not None:
+            for service, label in zip(matrix.services, best["labels"]):
+                cluster_map.setdefault(f"Cluster {label}", []).append(service)
+
+        data_source_info = get_data_source_info()
+        return {
+            "best_k": sweep["best_k"],
+            "clusters": cluster_map,
+            "candidates": [
+                {"k": c["k"], "inertia": round(c["inertia"], 4), "silhouette": None if c["silhouette"] is None else round(c["silhouette"], 4)}
+                for c in sweep["candidates"]
+            ],
+            "features": {
+                "normalized": sweep["normalized"],
+                "pca_components": sweep["pca_components"],
+                "dimensions": sweep["dimensions"]
+            },
+            "data_source": data_source_info["current_source"],
+            "data_source_info": data_source_info
+        }
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
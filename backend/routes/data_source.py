@@ -1,6 +1,9 @@
 from fastapi import APIRouter, HTTPException
 from typing import Dict, Any
-from utils.file_loader import get_data_source_info, load_cost_data, load_cost_data_flat
+from utils.file_loader import get_data_source_info, load_cost_data, load_cost_data_flat, get_cache_stats, get_cost_data_version
+from ml_utils import get_forecast_cache_stats
+from utils.compute import get_compute_stats
+from db import get_pool_stats
 # REMOVED: from aws.cost_fetcher import test_aws_connection  # SECURITY: Removed to prevent AWS charges
 
 router = APIRouter()
@@ -19,6 +22,23 @@ def get_data_source_status() -> Dict[str, Any]:
     """
     return get_data_source_info()
 
+@router.get("/data-source/cache")
+def get_data_cache_status() -> Dict[str, Any]:
+    """
+    Get statistics for the shared in-memory cost dataset cache.
+
+    Returns:
+        Dictionary containing hit/miss/reload counters, the current dataset version
+        forecast result cache statistics, analytics executor load and database pool usage
+    """
+    return {
+        "dataset_version": get_cost_data_version(),
+        "stats": get_cache_stats(),
+        "forecast_cache": get_forecast_cache_stats(),
+        "compute": get_compute_stats(),
+        "database_pool": get_pool_stats()
+    }
+
 @router.get("/data-source/test-connection")
 def test_data_source_connection() -> Dict[str, Any]:
     """
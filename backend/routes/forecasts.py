@@ -1,26 +1,13 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import Dict, List, Any, Optional
-from utils.file_loader import load_cost_data, get_data_source_info
-from ml_utils import forecast_costs
+from utils.file_loader import load_cost_store, get_data_source_info
+from ml_utils import forecast_cost_store
+from utils.compute import run_compute
+from utils.responses import trusted_response
 from schemas import ForecastResponse
 
 router = APIRouter()
 
-def convert_aws_data_to_flat_format(raw_data: dict) -> List[Dict]:
-    """Convert AWS Cost Explorer format to flat list format for forecasting."""
-    data = []
-    for day in raw_data.get("ResultsByTime", []):
-        date_str = day["TimePeriod"]["Start"]
-        for group in day["Groups"]:
-            service = group["Keys"][0]
-            amount = float(group["Metrics"]["UnblendedCost"]["Amount"])
-            data.append({
-                "date": date_str,
-                "service": service,
-                "amount": amount
-            })
-    return data
-
 @router.get("/forecast", response_model=ForecastResponse)
 async def get_cost_forecast(
     n_days: int = 7, 
@@ -49,21 +36,21 @@ async def get_cost_forecast(
                 detail="n_days must be between 1 and 30"
             )
         
-        # Load cost data from specified source or auto-detect
-        raw_data = load_cost_data(source)
-        data = convert_aws_data_to_flat_format(raw_data)
-        
-        # Filter by service if specified
-        if service:
-            data = [record for record in data if record.get('service') == service]
-            if not data:
+        def forecast():
+            # Load cost data from specified source or auto-detect (off the event loop: a reload parses the file)
+            store = load_cost_store(source)
+
+            # Filter by service if specified
+            if service and store.service_code(service) is None:
                 raise HTTPException(
-                    status_code=404, 
+                    status_code=404,
                     detail=f"Service '{service}' not found in data"
                 )
-        
+
+            return forecast_cost_store(store, n_days=n_days, service=service)
+
         # Generate forecast
-        forecast_result = forecast_costs(data, n_days=n_days)
+        forecast_result = await run_compute(forecast)
         
         # Add data source info and status
         data_source_info = get_data_source_info()
@@ -71,7 +58,7 @@ async def get_cost_forecast(
         forecast_result["data_source_info"] = data_source_info
         forecast_result["status"] = "success"
         
-        return forecast_result
+        return trusted_response(forecast_result, ForecastResponse)
         
     except HTTPException:
         raise
@@ -90,10 +77,7 @@ async def get_available_services_shortcut(
     Get list of available services (shortcut endpoint for frontend compatibility).
     """
     try:
-        raw_data = load_cost_data(source)
-        data = convert_aws_data_to_flat_format(raw_data)
-        services = list(set(record.get('service') for record in data if record.get('service')))
-        services.sort()
+        services = sorted(load_cost_store(source).services)
         
         # Add data source info
         data_source_info = get_data_source_info()
@@ -120,10 +104,7 @@ async def get_available_services(
     Get list of available services for forecasting.
     """
     try:
-        raw_data = load_cost_data(source)
-        data = convert_aws_data_to_flat_format(raw_data)
-        services = list(set(record.get('service') for record in data if record.get('service')))
-        services.sort()
+        services = sorted(load_cost_store(source).services)
         
         # Add data source info
         data_source_info = get_data_source_info()
@@ -157,11 +138,8 @@ async def compare_forecast_methods(
                 detail="n_days must be between 1 and 30"
             )
         
-        raw_data = load_cost_data(source)
-        data = convert_aws_data_to_flat_format(raw_data)
-        
         # Get forecast
-        forecast_result = forecast_costs(data, n_days=n_days)
+        forecast_result = await run_compute(lambda: forecast_cost_store(load_cost_store(source), n_days=n_days))
         
         # Calculate total cost
         total_cost = sum(pred['predicted_cost'] for pred in forecast_result['total_forecast'])
@@ -169,7 +147,7 @@ async def compare_forecast_methods(
         # Add data source info
         data_source_info = get_data_source_info()
         
-        return {
+        return trusted_response({
             "forecast": {
                 "total_cost": round(total_cost, 2),
                 "daily_predictions": forecast_result['total_forecast'],
@@ -179,8 +157,10 @@ async def compare_forecast_methods(
             "data_source": data_source_info["current_source"],
             "data_source_info": data_source_info,
             "status": "success"
-        }
+        })
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, 
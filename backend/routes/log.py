@@ -1,16 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
+from sqlalchemy import func, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.future import select
-from typing import List
+from datetime import date
+from typing import List, Optional
+import os
 
 from db import get_session
 from models import CostLog, User
 from schemas import LogCreate, LogResponse, LogUpdate
 from routes.auth import get_current_user
+from utils.pagination import decode_keyset_cursor, encode_keyset_cursor
+from utils.responses import trusted_response
 
 router = APIRouter()
 
+# Default and maximum /logs page sizes
+LOGS_PAGE_SIZE = int(os.getenv("LOGS_PAGE_SIZE", "100"))
+LOGS_MAX_PAGE_SIZE = int(os.getenv("LOGS_MAX_PAGE_SIZE", "1000"))
+
 # entry: uysed to validate; not for db
 @router.post("/log")
 async def create_log(entry: LogCreate, session: AsyncSession = Depends(get_session), current_user: User = Depends(get_current_user)):
@@ -33,15 +43,120 @@ async def create_log(entry: LogCreate, session: AsyncSession = Depends(get_sessi
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _log_filters(service: Optional[str], start_date: Optional[date], end_date: Optional[date],
+                 min_amount: Optional[float], max_amount: Optional[float]) -> list:
+    """WHERE conditions for the /logs filters (served by the (service, date) and (date) indexes)."""
+    conditions = []
+    if service is not None:
+        conditions.append(CostLog.service == service)
+    if start_date is not None:
+        conditions.append(CostLog.date >= start_date)
+    if end_date is not None:
+        conditions.append(CostLog.date <= end_date)
+    if min_amount is not None:
+        conditions.append(CostLog.amount >= min_amount)
+    if max_amount is not None:
+        conditions.append(CostLog.amount <= max_amount)
+    return conditions
+
+
 @router.get("/logs", response_model=List[LogResponse])
-async def read_logs(session: AsyncSession = Depends(get_session), current_user: User = Depends(get_current_user)):
+async def read_logs(
+    response: Response,
+    service: Optional[str] = Query(None, description="Only logs for this service"),
+    start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)"),
+    min_amount: Optional[float] = Query(None, description="Minimum amount"),
+    max_amount: Optional[float] = Query(None, description="Maximum amount"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="Sort by (date, id) ascending or descending"),
+    limit: int = Query(LOGS_PAGE_SIZE, ge=1, le=LOGS_MAX_PAGE_SIZE, description="Logs per page"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Page through logs in (date, id) order.
+
+    Pages are keyset-paginated: when more logs match, the X-Next-Cursor response header
+    holds the (date, id) of the last row. The next page starts with a row-value comparison,
+    (date, id) > (last_date, last_id), which seeks the (date, id) index directly instead of
+    walking the earlier rows, so a page deep in the table costs the same as the first.
+    With a service filter the (service, date) index is used instead.
+    """
+    conditions = _log_filters(service, start_date, end_date, min_amount, max_amount)
+    descending = order == "desc"
+    if cursor:
+        last_date, last_id = decode_keyset_cursor(cursor, 2)
+        try:
+            last_date, last_id = date.fromisoformat(last_date), int(last_id)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # Row-value comparison, not (date > d OR (date = d AND id > i)): an OR cannot bound the index
+        key = tuple_(CostLog.date, CostLog.id)
+        conditions.append(key < (last_date, last_id) if descending else key > (last_date, last_id))
+
+    sort = (CostLog.date.desc(), CostLog.id.desc()) if descending else (CostLog.date, CostLog.id)
+    # Plain column rows (no ORM objects); one extra row tells whether another page follows
+    query = (
+        select(CostLog.id, CostLog.date, CostLog.service, CostLog.amount)
+        .where(*conditions)
+        .order_by(*sort)
+        .limit(limit + 1)
+    )
     try:
-        result = await session.execute(select(CostLog))
-        logs = result.scalars().all()
-        return logs
+        rows = (await session.execute(query)).all()
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_keyset_cursor(rows[-1].date.isoformat(), rows[-1].id)
+
+    # Same shape as LogResponse (cost_logs has no source column, so it is always null)
+    logs = [
+        {"id": log_id, "date": log_date.isoformat(), "service": log_service, "amount": amount, "source": None}
+        for log_id, log_date, log_service, amount in rows
+    ]
+    result = trusted_response(logs)
+    # A Response unless VALIDATE_RESPONSES is set (then FastAPI renders it with `response`'s headers)
+    (result if isinstance(result, Response) else response).headers.update(headers)
+    return result
+
+
+@router.get("/logs/aggregate")
+async def aggregate_logs(
+    by: str = Query("day", pattern="^(day|service|day_service)$", description="Group totals by day, service or both"),
+    service: Optional[str] = Query(None, description="Only logs for this service"),
+    start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)"),
+    min_amount: Optional[float] = Query(None, description="Minimum amount"),
+    max_amount: Optional[float] = Query(None, description="Maximum amount"),
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Per-day and/or per-service totals of the matching logs, aggregated by the database."""
+    keys = {"day": [CostLog.date], "service": [CostLog.service], "day_service": [CostLog.date, CostLog.service]}[by]
+    query = (
+        select(*keys, func.sum(CostLog.amount), func.count(CostLog.id))
+        .where(*_log_filters(service, start_date, end_date, min_amount, max_amount))
+        .group_by(*keys)
+        .order_by(*keys)
+    )
+    try:
+        rows = (await session.execute(query)).all()
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    names = {"day": ["date"], "service": ["service"], "day_service": ["date", "service"]}[by]
+    totals = []
+    for row in rows:
+        entry = {name: value.isoformat() if name == "date" else value for name, value in zip(names, row)}
+        entry["total_amount"] = round(row[-2], 2)
+        entry["count"] = row[-1]
+        totals.append(entry)
+    return trusted_response({"by": by, "totals": totals})
+
 @router.put("/log/{log_id}")
 async def update_log(log_id: int, log_update: LogUpdate, session: AsyncSession = Depends(get_session), current_user: User = Depends(get_current_user)):
     try:
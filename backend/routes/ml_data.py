@@ -1,8 +1,10 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import Optional, List
 from datetime import date
-from utils.file_loader import load_cost_data_flat, get_data_source_info
-import pandas as pd
+from utils.file_loader import load_cost_store, get_data_source_info
+from utils.pagination import page_bounds
+from utils.responses import ndjson_response, trusted_response
+import numpy as np
 
 router = APIRouter()
 
@@ -16,10 +18,18 @@ def get_cleaned_cost_data(
     sort_by: Optional[str] = Query("date", description="Sort by: date, amount, service"),
     sort_order: Optional[str] = Query("asc", description="Sort order: asc, desc"),
     limit: Optional[int] = Query(None, description="Limit number of results"),
+    offset: int = Query(0, ge=0, description="Skip this many results (pagination)"),
+    page_size: Optional[int] = Query(None, ge=1, le=10000, description="Results per page (default: all)"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json, or ndjson to stream the rows"),
     source: Optional[str] = Query(None, description="Data source: 'mock', 'real', or None for auto-detect")
 ):
     """
     Returns cleaned AWS cost data in flat format with optional filtering and sorting.
+
+    Large results can be paged (offset/page_size, or the returned next_cursor) or
+    streamed as NDJSON (format=ndjson: one record per line, summary in X-Total-Count
+    / X-Next-Cursor headers).
     
     Example response:
     [
@@ -28,55 +38,60 @@ def get_cleaned_cost_data(
     ]
     """
     try:
-        # Load and clean the data from specified source or auto-detect
-        df = load_cost_data_flat(source)
-        
-        # Apply filters
-        if service:
-            df = df[df['service'] == service]
-        
-        if start_date:
-            df = df[df['date'] >= pd.to_datetime(start_date)]
-        
-        if end_date:
-            df = df[df['date'] <= pd.to_datetime(end_date)]
-        
-        if min_amount is not None:
-            df = df[df['amount'] >= min_amount]
-        
-        if max_amount is not None:
-            df = df[df['amount'] <= max_amount]
+        # Filter the columnar data from specified source or auto-detect
+        store = load_cost_store(source)
+        rows = store.select(
+            start_date=start_date,
+            end_date=end_date,
+            service=service or None,
+            min_amount=min_amount,
+            max_amount=max_amount
+        )
         
         # Sort data
         if sort_by in ['date', 'amount', 'service']:
-            ascending = sort_order.lower() == 'asc'
-            df = df.sort_values(by=sort_by, ascending=ascending)
+            rows = store.sort_rows(rows, sort_by, ascending=sort_order.lower() == 'asc')
         
         # Apply limit
         if limit and limit > 0:
-            df = df.head(limit)
-        
-        # Convert to list of dicts and format dates
-        result = df.to_dict(orient="records")
-        
-        # Format dates as strings for JSON serialization
-        for record in result:
-            record['date'] = record['date'].strftime('%Y-%m-%d')
+            rows = rows[:limit]
+
+        query = {
+            "service": service, "start_date": start_date, "end_date": end_date, "min_amount": min_amount,
+            "max_amount": max_amount, "sort_by": sort_by, "sort_order": sort_order, "limit": limit
+        }
+        start, stop, next_cursor = page_bounds(len(rows), store.fingerprint, offset, page_size, cursor, query)
+        page = rows[start:stop]
+
+        if format == "ndjson":
+            headers = {"X-Total-Count": str(len(rows))}
+            if next_cursor:
+                headers["X-Next-Cursor"] = next_cursor
+            return ndjson_response(store.iter_records(page), headers=headers)
+
+        days = store.date_ordinals[rows]
+        total_amount = store.amounts[rows].sum()
         
         # Add data source info
         data_source_info = get_data_source_info()
         
-        return {
-            "data": result,
+        return trusted_response({
+            "data": store.records(page),
             "summary": {
-                "total_records": len(result),
+                "total_records": len(rows),
                 "date_range": {
-                    "start": df['date'].min().strftime('%Y-%m-%d') if len(df) > 0 else None,
-                    "end": df['date'].max().strftime('%Y-%m-%d') if len(df) > 0 else None
+                    "start": str(days.min().astype("datetime64[D]")) if len(rows) > 0 else None,
+                    "end": str(days.max().astype("datetime64[D]")) if len(rows) > 0 else None
                 },
-                "services": sorted(df['service'].unique().tolist()) if len(df) > 0 else [],
-                "total_amount": round(df['amount'].sum(), 2) if len(df) > 0 else 0,
-                "average_amount": round(df['amount'].mean(), 2) if len(df) > 0 else 0
+                "services": sorted(store.service_names[np.unique(store.service_codes[rows])].tolist()),
+                "total_amount": round(total_amount, 2) if len(rows) > 0 else 0,
+                "average_amount": round(total_amount / len(rows), 2) if len(rows) > 0 else 0
+            },
+            "pagination": {
+                "offset": start,
+                "page_size": page_size,
+                "returned": len(page),
+                "next_cursor": next_cursor
             },
             "filters_applied": {
                 "service": service,
@@ -91,7 +106,9 @@ def get_cleaned_cost_data(
             },
             "data_source": data_source_info["current_source"],
             "data_source_info": data_source_info
-        }
+        })
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing cleaned cost data: {str(e)}")
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, HTTPException, Query
-import json
+import numpy as np
 from pathlib import Path
 from pydantic import BaseModel
 from typing import Optional
 from datetime import date
-from utils.file_loader import load_cost_data, load_mock_cost_data, get_data_source_info
+from utils.file_loader import load_cost_store, get_data_source_info
+from utils.pagination import page_bounds
+from utils.responses import ndjson_response, trusted_response
 
 router = APIRouter()
 
@@ -18,46 +20,48 @@ async def get_mock_data():
     }
 
 @router.get("/cost")
-def get_formatted_cost_data(source: Optional[str] = Query(None, description="Data source: 'mock', 'real', or None for auto-detect")):
+def get_formatted_cost_data(
+    source: Optional[str] = Query(None, description="Data source: 'mock', 'real', or None for auto-detect"),
+    offset: int = Query(0, ge=0, description="Skip this many records (pagination)"),
+    page_size: Optional[int] = Query(None, ge=1, le=10000, description="Records per page (default: all)"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json, or ndjson to stream the records")
+):
     """
     Get formatted cost data from specified source or auto-detect based on environment.
     
     Args:
         source: Optional data source override ('mock', 'real', or None for auto-detect)
+        offset, page_size, cursor: Optional paging (next_cursor is returned while more pages remain)
+        format: 'ndjson' streams one record per line (total in X-Total-Count, next page in X-Next-Cursor)
     """
-    try:
-        raw_data = load_cost_data(source)
-    except FileNotFoundError:
-        raise HTTPException(status_code=500, detail="Cost data file not found.")
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="Cost data is not valid JSON.")
+    store = load_cost_store(source)
 
-    formatted_data = []
+    start, stop, next_cursor = page_bounds(len(store), store.fingerprint, offset, page_size, cursor)
+    rows = np.arange(start, stop)
 
-    try:
-        for day in raw_data["ResultsByTime"]:
-            date = day["TimePeriod"]["Start"]
-            for group in day["Groups"]:
-                service = group["Keys"][0]
-                amount = float(group["Metrics"]["UnblendedCost"]["Amount"])
-                formatted_data.append({
-                    "date": date,
-                    "service": service,
-                    "amount": round(amount, 2)
-                })
-
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error parsing cost data: {str(e)}")
+    if format == "ndjson":
+        headers = {"X-Total-Count": str(len(store))}
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        return ndjson_response(store.iter_records(rows, decimals=2), headers=headers)
 
     # Add data source info to response
     data_source_info = get_data_source_info()
     
-    return {
-        "cost_data": formatted_data,
+    return trusted_response({
+        "cost_data": store.records(rows, decimals=2),
         "data_source": data_source_info["current_source"],
-        "total_records": len(formatted_data),
+        "total_records": len(store),
+        "pagination": {
+            "offset": start,
+            "page_size": page_size,
+            "returned": len(rows),
+            "next_cursor": next_cursor
+        },
         "data_source_info": data_source_info
-    }
+    })
+
 
 @router.get("/data-source")
 def get_data_source_status():
@@ -78,106 +82,71 @@ def filter_costs(
     limit: Optional[int] = Query(None, gt=0),
     sort_by: Optional[str] = Query(None, regex="^(amount|date)$")
 ):
+    store = load_cost_store()
+
     try:
-        raw_data = load_mock_cost_data()
-    except FileNotFoundError:
-        raise HTTPException(status_code=500, detail="Mock cost data file not found.")
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="Cost data is not valid JSON.")
+        rows = store.select(
+            start_date=filter.start_date,
+            end_date=filter.end_date,
+            service=filter.service or None,
+            min_amount=filter.min_amount or None
+        )
 
-    filtered_data = []
+        # Sorting (stable, on the rounded amounts that are returned)
+        if sort_by == "amount":
+            rows = rows[np.argsort(-np.round(store.amounts[rows], 2), kind="stable")]
+        elif sort_by == "date":
+            rows = rows[np.argsort(store.date_ordinals[rows], kind="stable")]
 
-    try:
-        for day in raw_data["ResultsByTime"]:
-            date_str = day["TimePeriod"]["Start"]
-            day_date = date.fromisoformat(date_str)
-
-            if filter.start_date and day_date < filter.start_date:
-                continue
-            if filter.end_date and day_date > filter.end_date:
-                continue
-
-            for group in day["Groups"]:
-                service = group["Keys"][0]
-                amount = float(group["Metrics"]["UnblendedCost"]["Amount"])
-
-                if filter.service and service != filter.service:
-                    continue
-                if filter.min_amount and amount < filter.min_amount:
-                    continue
-
-                filtered_data.append({
-                    "date": date_str,
-                    "service": service,
-                    "amount": round(amount, 2)
-                })
+        # Limit filtering (before building any records)
+        if limit:
+            rows = rows[:limit]
+
+        filtered_data = store.records(rows, decimals=2)
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error filtering cost data: {str(e)}")
-    
-    # Sorting
-    if sort_by == "amount":
-        filtered_data.sort(key=lambda x: x["amount"], reverse=True)
-    elif sort_by == "date":
-        filtered_data.sort(key=lambda x: x["date"])  # ISO format sorts fine
 
-    # Limit filtering
-    if limit:
-        filtered_data = filtered_data[:limit]
-
-    return {"filtered_results": filtered_data}
+    return trusted_response({"filtered_results": filtered_data})
 
 
 
 @router.get("/services")
 def get_unique_services():
-    try:
-        raw_data = load_mock_cost_data()
-    except FileNotFoundError:
-        raise HTTPException(status_code=500, detail="Mock cost data file not found.")
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="Cost data is not valid JSON.")
-    
-    services = set()
-
-    try:
-        for day in raw_data["ResultsByTime"]:
-            for group in day["Groups"]:
-                service = group["Keys"][0]
-                services.add(service)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error extracting services: {str(e)}")
-
-    return {"services": sorted(list(services))}
+    return {"services": sorted(load_cost_store().services)}
 
 # route to get summary
 @router.get('/summary')
-def get_service_summary():
-    try:
-        raw_data = load_mock_cost_data()
-    except FileNotFoundError:
-        raise HTTPException(status_code=500, detail="Mock cost data not found")
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="Cost data is not valid JSON.")
+def get_service_summary(
+    start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)"),
+    period: Optional[str] = Query(None, pattern="^(day|week|month)$", description="Also return totals per day, week or month")
+):
+    store = load_cost_store()
     
-    summary = {}
-
     try:
-        for day in raw_data["ResultsByTime"]:
-            for group in day["Groups"]:
-                service = group["Keys"][0]
-                amount = float(group["Metrics"]["UnblendedCost"]["Amount"])
-
-                # Add to the running total for each service
-                if service not in summary:
-                    summary[service] = 0
-                summary[service] += amount
-    
+        # Totals for each service, from the prefix-sum rollup
+        summary = store.range_totals(start_date, end_date)
+
+        if period:
+            labels, sums, counts = store.rollup.by_period(period, start_date, end_date)
+            columns = store.rollup.column_of_code
+            rollup = {
+                "period": period,
+                "periods": labels,
+                "totals": {
+                    service: np.round(sums[:, column], 2).tolist()
+                    for service, column in zip(store.services, columns.tolist())
+                    if counts[:, column].any()
+                }
+            }
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error generating summary: {str(e)}")
     
     # Rounding amounts to display 
     rounded_summary = {k: round(v, 2) for k, v in summary.items()}
+    if period:
+        return {"summary": rounded_summary, "rollup": rollup}
     return {"summary": rounded_summary}
 
 
@@ -188,40 +157,39 @@ class DateRange(BaseModel):
 
 @router.post("/top-service")
 def get_top_service(date_range: DateRange):
-    try:
-        raw_data = load_mock_cost_data()
-    except FileNotFoundError:
-        raise HTTPException(status_code=500, detail="Mock cost data file not found.")
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="Cost Data is not valid JSON.")
+    store = load_cost_store()
     
-    totals = {}
-
     try:
-        for day in raw_data["ResultsByTime"]:
-            date_str = day["TimePeriod"]["Start"]
-            day_date = date.fromisoformat(date_str)
-
-            # Date filtering logic
-            if date_range.start_date and day_date < date_range.start_date:
-                continue
-            if date_range.end_date and day_date > date_range.end_date:
-                continue
-
-            for group in day["Groups"]:
-                service = group["Keys"][0]
-                amount = float(group["Metrics"]["UnblendedCost"]["Amount"])
-
-                if service not in totals:
-                    totals[service] = 0
-                totals[service] += amount
-    
+        # Largest date range total from the prefix-sum rollup
+        top = store.top_services(1, date_range.start_date, date_range.end_date)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error calculating top service: {str(e)}")
     
-    if not totals:
+    if not top:
         return {"message": "No data found in given range"}
     
-    top_service = max(totals.items(), key=lambda x: x[1])
+    top_service = top[0]
     return {"top-service": top_service[0], "total-amount": round(top_service[1], 2)}
+
+
+# route for the k most expensive services
+@router.get('/top-services')
+def get_top_services(
+    k: int = Query(5, ge=1, le=1000, description="Number of services to return"),
+    start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)")
+):
+    store = load_cost_store()
+
+    try:
+        # Partial selection over the rollup totals, no full sort
+        top = store.top_services(k, start_date, end_date)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error calculating top services: {str(e)}")
+
+    return {
+        "top_services": [{"service": service, "total_amount": round(total, 2)} for service, total in top],
+        "k": k,
+        "count": len(top)
+    }
     
\ No newline at end of file
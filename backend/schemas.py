@@ -42,6 +42,8 @@ class AnomalyResponse(BaseModel):
     flattened_anomalies: List[AnomalyPoint]
     summary: AnomalySummary
     threshold_used: float
+    mode: str = "global"
+    window: Optional[int] = None
     status: str
 
 class ThresholdSummary(BaseModel):
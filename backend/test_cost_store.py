@@ -0,0 +1,195 @@
+import json
+from datetime import date
+
+import numpy as np
+import pytest
+
+from utils.cost_store import CostStore, build_cost_store, stream_cost_store, to_day_number
+
+
+RAW_DATA = {
+    "ResultsByTime": [
+        {
+            "TimePeriod": {"Start": "2024-06-01", "End": "2024-06-02"},
+            "Groups": [
+                {"Keys": ["Amazon S3"], "Metrics": {"UnblendedCost": {"Amount": "4.71", "Unit": "USD"}}},
+                {"Keys": ["Amazon EC2"], "Metrics": {"UnblendedCost": {"Amount": "20.73", "Unit": "USD"}}},
+            ],
+        },
+        {
+            "TimePeriod": {"Start": "2024-06-02", "End": "2024-06-03"},
+            "Groups": [
+                {"Keys": ["Amazon EC2"], "Metrics": {"UnblendedCost": {"Amount": "22.10", "Unit": "USD"}}},
+            ],
+        },
+    ]
+}
+
+
+def test_store_columns():
+    store = build_cost_store(RAW_DATA)
+    assert len(store) == 3
+    assert store.services == ["Amazon S3", "Amazon EC2"]
+    assert store.service_codes.tolist() == [0, 1, 1]
+    assert store.amounts.dtype == np.float64
+    assert store.day_labels.tolist() == ["2024-06-01", "2024-06-02"]
+
+
+def test_select_and_records():
+    store = build_cost_store(RAW_DATA)
+    rows = store.select(start_date=date(2024, 6, 2))
+    assert store.records(rows) == [{"date": "2024-06-02", "service": "Amazon EC2", "amount": 22.10}]
+    assert len(store.select(service="Unknown")) == 0
+
+
+def test_totals_and_pivot():
+    store = build_cost_store(RAW_DATA)
+    assert store.totals_by_service() == {"Amazon S3": 4.71, "Amazon EC2": 20.73 + 22.10}
+
+    pivot = store.pivot_frame()
+    assert list(pivot.columns) == ["Amazon EC2", "Amazon S3"]
+    assert pivot.loc["2024-06-02", "Amazon S3"] == 0
+
+
+def test_matrix_is_cached_read_only_and_shared():
+    store = build_cost_store(RAW_DATA)
+    matrix = store.matrix
+    assert store.matrix is matrix
+    assert matrix.values.flags["C_CONTIGUOUS"]
+    assert not matrix.values.flags["WRITEABLE"]
+    assert matrix.values.tolist() == [[20.73, 4.71], [22.10, 0.0]]
+    assert np.shares_memory(matrix.frame().values, matrix.values)
+
+
+def test_matrix_and_rollup_are_built_once_under_concurrent_use(monkeypatch):
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from utils.cost_store import CostMatrix
+
+    previous = build_cost_store(RAW_DATA)
+    previous.matrix
+    store = build_cost_store(RAW_DATA)
+    store.extend_matrix(previous)
+
+    builds = []
+    from_store = CostMatrix.from_store.__func__
+    def slow_from_store(cls, source):
+        builds.append(threading.get_ident())
+        time.sleep(0.05)
+        return from_store(cls, source)
+    monkeypatch.setattr(CostMatrix, "from_store", classmethod(slow_from_store))
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda _: (store.matrix, store.rollup), range(8)))
+
+    assert len(builds) == 1
+    assert all(matrix is store.matrix and rollup is store.rollup for matrix, rollup in results)
+    # The link to the previous version is not lost to a duplicate build
+    assert store.matrix.previous is previous.matrix
+
+
+def test_streaming_ingest_matches_json_load(tmp_path):
+    path = tmp_path / "export.json"
+    document = {"GroupDefinitions": [{"Type": "DIMENSION", "Key": "SERVICE"}], **RAW_DATA, "NextPageToken": 7}
+    path.write_text(json.dumps(document, indent=2))
+
+    # Tiny chunks force values to be split across reads
+    streamed = stream_cost_store(path, chunk_size=16)
+    expected = build_cost_store(RAW_DATA)
+    assert streamed.services == expected.services
+    assert streamed.records() == expected.records()
+
+
+def test_date_rows_use_index_for_unsorted_storage():
+    ordinals = np.array([19003, 19000, 19002, 19000, 19005, 19001])
+    store = CostStore(ordinals, np.zeros(6, dtype=np.int32), np.arange(6.0), ["A"])
+    for start, end in [(None, None), (date(2022, 1, 8), None), (None, date(2022, 1, 6)),
+                       (date(2022, 1, 9), date(2022, 1, 11)), (date(2022, 1, 20), None)]:
+        expected = np.flatnonzero(
+            (ordinals >= (to_day_number(start) if start else -1)) & (ordinals <= (to_day_number(end) if end else 10**9))
+        )
+        assert store.date_rows(start, end).tolist() == expected.tolist()
+    assert store.select(start_date=date(2022, 1, 10), min_amount=2).tolist() == [2, 4]
+
+
+def _daily_export(amounts):
+    """Export with one result per day from 2024-01-29 (a Monday); amounts[d] maps service -> cost."""
+    start = to_day_number(date(2024, 1, 29))
+    return {
+        "ResultsByTime": [
+            {
+                "TimePeriod": {"Start": str(np.datetime64(start + d, "D")), "End": str(np.datetime64(start + d + 1, "D"))},
+                "Groups": [
+                    {"Keys": [service], "Metrics": {"UnblendedCost": {"Amount": str(amount), "Unit": "USD"}}}
+                    for service, amount in day.items()
+                ],
+            }
+            for d, day in enumerate(amounts)
+        ]
+    }
+
+
+def test_range_totals_match_select():
+    rng = np.random.default_rng(3)
+    amounts = [
+        {f"Service {s}": round(float(rng.uniform(0, 50)), 2) for s in rng.choice(6, 4, replace=False)}
+        for _ in range(60)
+    ]
+    store = build_cost_store(_daily_export(amounts))
+
+    for start, end in ((None, None), (date(2024, 2, 3), date(2024, 2, 20)), (date(2024, 3, 1), None),
+                       (date(2025, 1, 1), None), (date(2024, 2, 10), date(2024, 2, 9))):
+        expected = store.totals_by_service(store.select(start_date=start, end_date=end))
+        totals = store.range_totals(start, end)
+        assert list(totals) == list(expected)
+        assert np.allclose(list(totals.values()), list(expected.values()))
+
+
+def test_rollup_by_week_and_month():
+    store = build_cost_store(_daily_export([{"Amazon EC2": 1.0, "Amazon S3": 0.5}] * 40))
+    column = store.rollup.services.index("Amazon EC2")
+
+    labels, sums, counts = store.rollup.by_period("week")
+    assert labels[:2] == ["2024-01-29", "2024-02-05"]
+    assert sums[:, column].tolist() == [7.0] * 5 + [5.0]
+    assert counts.sum() == 80
+
+    labels, sums, _ = store.rollup.by_period("month", end_date=date(2024, 2, 29))
+    assert labels == ["2024-01", "2024-02"]
+    assert sums[:, column].tolist() == [3.0, 29.0]
+
+
+def test_rollup_extends_from_previous_version():
+    rng = np.random.default_rng(5)
+    amounts = [{f"Service {s}": round(float(a), 2) for s, a in enumerate(rng.uniform(0, 9, 3))} for _ in range(30)]
+    previous = build_cost_store(_daily_export(amounts))
+    previous.rollup
+
+    # Last day restated and a week appended
+    amounts = amounts[:-1] + [{"Service 0": 1.0, "Service 1": 2.0, "Service 2": 3.0}] * 8
+    store = build_cost_store(_daily_export(amounts))
+    store.extend_rollup(previous)
+    fresh = build_cost_store(_daily_export(amounts)).rollup
+
+    assert np.allclose(store.rollup.sums, fresh.sums)
+    assert np.array_equal(store.rollup.counts, fresh.counts)
+    assert store.range_totals(date(2024, 2, 20)) == pytest.approx(store.totals_by_service(store.select(start_date=date(2024, 2, 20))))
+
+
+def test_top_services_matches_sorted_totals():
+    rng = np.random.default_rng(7)
+    amounts = [
+        {f"Service {s}": float(rng.integers(0, 5)) for s in rng.choice(40, 25, replace=False)}
+        for _ in range(20)
+    ]
+    store = build_cost_store(_daily_export(amounts))
+
+    totals = store.range_totals(date(2024, 2, 1), date(2024, 2, 10))
+    # Stable sort by total: ties stay in first-seen order
+    expected = sorted(totals.items(), key=lambda item: -item[1])
+    for k in (1, 3, 10, len(totals), len(totals) + 5):
+        top = store.top_services(k, date(2024, 2, 1), date(2024, 2, 10))
+        assert [service for service, _ in top] == [service for service, _ in expected[:k]]
+    assert store.top_services(1, date(2024, 2, 1), date(2024, 2, 10))[0] == max(totals.items(), key=lambda x: x[1])
+    assert store.top_services(3, date(2025, 1, 1)) == []
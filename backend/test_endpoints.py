@@ -36,3 +36,139 @@ def test_anomalies_ok():
     assert "anomalies" in r.json()
 
 
+def test_anomalies_summary_custom_thresholds():
+    r = client.get("/api/anomalies/summary?thresholds=0.5,1,3")
+    assert r.status_code == 200
+    assert list(r.json()["threshold_summary"]) == ["threshold_0.5", "threshold_1.0", "threshold_3.0"]
+
+    r = client.get("/api/anomalies/summary?thresholds=1,abc")
+    assert r.status_code == 400
+    assert client.get("/api/anomalies/summary?thresholds=1,nan").status_code == 400
+
+
+def test_anomalies_rolling_mode():
+    r = client.get("/api/anomalies?mode=rolling&window=14&z_threshold=2.5")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["mode"] == "rolling"
+    assert body["window"] == 14
+
+    r = client.get("/api/anomalies?mode=rolling&window=1")
+    assert r.status_code == 422
+
+
+def test_analytics_rejected_with_429_when_compute_is_saturated(monkeypatch):
+    from utils import compute
+
+    monkeypatch.setattr(compute, "COMPUTE_QUEUE_LIMIT", 0)
+    r = client.get("/api/forecast?n_days=7")
+    assert r.status_code == 429
+    assert r.headers["Retry-After"] == "1"
+    assert client.get("/api/anomalies").status_code == 429
+    assert client.get("/health").status_code == 200
+
+
+def test_compute_counts_cancelled_requests_until_the_work_finishes():
+    import asyncio
+    import threading
+    import time
+    from utils import compute
+
+    release = threading.Event()
+
+    async def cancel_while_running():
+        task = asyncio.ensure_future(compute.run_compute(release.wait, 5))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(cancel_while_running())
+    # The request is gone but its thread still holds a compute slot
+    assert compute.get_compute_stats()["in_flight"] == 1
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while compute.get_compute_stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert compute.get_compute_stats()["in_flight"] == 0
+
+
+def test_forecast_unknown_service_is_404():
+    assert client.get("/api/forecast?service=Nope").status_code == 404
+
+
+def test_clusters_auto_picks_k_from_sweep():
+    r = client.get("/api/clusters/auto?k_min=2&k_max=4")
+    assert r.status_code == 200
+    body = r.json()
+    assert [c["k"] for c in body["candidates"]] == [2, 3, 4]
+    assert len(body["clusters"]) == body["best_k"]
+    assert client.get("/api/clusters/auto?k_min=5&k_max=3").status_code == 400
+
+
+def test_clusters_compact_and_binary_service_vectors():
+    import json
+    import struct
+
+    import numpy as np
+
+    full = client.get("/api/clusters").json()["service_vectors"]
+    compact = client.get("/api/clusters?format=compact").json()["service_vectors"]
+    ec2 = compact["values"]["Amazon EC2"]
+    assert ec2 == [full[d]["Amazon EC2"] for d in compact["dates"]]
+
+    r = client.get("/api/clusters", headers={"Accept": "application/octet-stream"})
+    assert r.headers["content-type"] == "application/octet-stream"
+    body = r.content
+    header_length = struct.unpack("<I", body[4:8])[0]
+    header = json.loads(body[8:8 + header_length])
+    offset = 8 + header_length + (-(8 + header_length) % 8)
+    values = np.frombuffer(body, dtype="<f8", offset=offset).reshape(header["shape"])
+    assert body[:4] == b"ISCV"
+    assert header["dates"] == compact["dates"]
+    assert values[header["services"].index("Amazon EC2")].tolist() == ec2
+
+
+def test_trusted_responses_match_validated_responses(monkeypatch):
+    from utils import responses
+
+    urls = ["/api/forecast?n_days=7", "/api/anomalies", "/api/anomalies/summary", "/api/forecast/compare"]
+    fast = [client.get(url).json() for url in urls]
+    monkeypatch.setattr(responses, "VALIDATE_RESPONSES", True)
+    assert [client.get(url).json() for url in urls] == fast
+
+
+def test_cost_pages_follow_cursor_and_match_full_result():
+    full = client.get("/api/cost").json()["cost_data"]
+    pages, url = [], "/api/cost?page_size=2000"
+    while url:
+        body = client.get(url).json()
+        pages.extend(body["cost_data"])
+        cursor = body["pagination"]["next_cursor"]
+        url = f"/api/cost?page_size=2000&cursor={cursor}" if cursor else None
+    assert pages == full
+    assert client.get("/api/cost?cursor=not-a-cursor").status_code == 400
+
+
+def test_cleaned_costs_ndjson_stream_matches_json_page():
+    import json
+
+    query = "service=Amazon%20EC2&sort_by=amount&sort_order=desc&offset=10&page_size=25"
+    page = client.get(f"/api/ml/cleaned-costs?{query}").json()
+    r = client.get(f"/api/ml/cleaned-costs?{query}&format=ndjson")
+    assert r.headers["content-type"] == "application/x-ndjson"
+    assert r.headers["X-Total-Count"] == str(page["summary"]["total_records"])
+    assert r.headers["X-Next-Cursor"] == page["pagination"]["next_cursor"]
+    assert [json.loads(line) for line in r.text.splitlines()] == page["data"]
+
+
+def test_cleaned_costs_cursor_is_bound_to_its_query():
+    query = "service=Amazon%20EC2&sort_by=amount&sort_order=desc"
+    cursor = client.get(f"/api/ml/cleaned-costs?{query}&page_size=25").json()["pagination"]["next_cursor"]
+
+    # Page size may change between pages
+    assert client.get(f"/api/ml/cleaned-costs?{query}&page_size=50&cursor={cursor}").status_code == 200
+    # The offset would point into a differently filtered / ordered result
+    r = client.get(f"/api/ml/cleaned-costs?service=Amazon%20S3&page_size=25&cursor={cursor}")
+    assert r.status_code == 400
+    assert client.get(f"/api/ml/cleaned-costs?{query.replace('desc', 'asc')}&cursor={cursor}").status_code == 400
@@ -0,0 +1,168 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from utils import file_loader
+
+
+def _write_dataset(path, amount):
+    payload = {
+        "ResultsByTime": [
+            {
+                "TimePeriod": {"Start": "2024-06-01", "End": "2024-06-02"},
+                "Groups": [
+                    {"Keys": ["Amazon EC2"], "Metrics": {"UnblendedCost": {"Amount": amount, "Unit": "USD"}}}
+                ],
+            }
+        ]
+    }
+    path.write_text(json.dumps(payload))
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    path = tmp_path / "cost.json"
+    _write_dataset(path, "1.00")
+    monkeypatch.setattr(file_loader, "MOCK_DATA_PATH", path)
+    file_loader.clear_cache()
+    yield path
+    file_loader.clear_cache()
+
+
+def test_cache_parses_once_and_shares_result(dataset):
+    first = file_loader.load_mock_cost_data()
+    second = file_loader.load_mock_cost_data()
+    assert first is second
+    assert file_loader.get_cache_stats()["misses"] == 1
+    assert file_loader.get_cache_stats()["hits"] == 1
+
+
+def test_cached_data_is_read_only(dataset):
+    data = file_loader.load_mock_cost_data()
+    with pytest.raises(TypeError):
+        data["ResultsByTime"] = []
+    with pytest.raises(AttributeError):
+        data["ResultsByTime"].append({})
+    # Shallow copies share only frozen values
+    with pytest.raises(AttributeError):
+        dict(data)["ResultsByTime"].append({})
+
+
+def test_cached_data_copies_are_plain_and_mutable(dataset):
+    import copy
+    import pickle
+
+    data = file_loader.load_mock_cost_data()
+    for thawed in (copy.deepcopy(data), file_loader.thaw(data)):
+        thawed["ResultsByTime"][0]["Groups"].append({})
+        assert type(thawed["ResultsByTime"]) is list
+    assert type(copy.copy(data)) is dict
+    assert pickle.loads(pickle.dumps(data)) == data
+    assert len(data["ResultsByTime"][0]["Groups"]) == 1
+
+
+def test_cache_reloads_when_file_changes(dataset):
+    before = file_loader.load_mock_cost_data()
+    version = file_loader.get_cost_data_version()
+
+    _write_dataset(dataset, "2.50")
+    stat = os.stat(dataset)
+    os.utime(dataset, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    after = file_loader.load_mock_cost_data()
+    assert after is not before
+    assert after["ResultsByTime"][0]["Groups"][0]["Metrics"]["UnblendedCost"]["Amount"] == "2.50"
+    assert file_loader.get_cost_data_version() != version
+    assert file_loader.get_cache_stats()["reloads"] == 1
+
+
+def test_reload_listeners_run_outside_the_cache_lock(dataset, monkeypatch):
+    seen = []
+    monkeypatch.setattr(file_loader, "_reload_listeners", [
+        lambda old_version: seen.append((old_version, file_loader._cache_lock.locked()))
+    ])
+    version = file_loader.get_cost_data_version()
+
+    _write_dataset(dataset, "2.50")
+    stat = os.stat(dataset)
+    os.utime(dataset, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    file_loader.load_mock_cost_data()
+
+    assert seen == [(version, False)]
+
+
+def test_changed_file_is_hashed_outside_the_cache_lock(dataset, monkeypatch):
+    file_digest = file_loader._file_digest
+    locked = []
+    monkeypatch.setattr(file_loader, "_file_digest", lambda path: locked.append(file_loader._cache_lock.locked()) or file_digest(path))
+
+    file_loader.load_mock_cost_data()
+    stat = os.stat(dataset)
+    os.utime(dataset, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    file_loader.load_mock_cost_data()
+
+    assert locked == [False, False]
+    assert file_loader.get_cache_stats()["hits"] == 1
+
+
+def test_touch_without_content_change_does_not_reparse(dataset):
+    before = file_loader.load_mock_cost_data()
+    stat = os.stat(dataset)
+    os.utime(dataset, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert file_loader.load_mock_cost_data() is before
+    assert file_loader.get_cache_stats()["reloads"] == 0
+
+
+def test_store_snapshot_is_memory_mapped_and_rebuilt_on_change(dataset):
+    store = file_loader.load_cost_store()
+    assert file_loader.get_cache_stats()["snapshot_builds"] == 1
+    assert store.records() == [{"date": "2024-06-01", "service": "Amazon EC2", "amount": 1.0}]
+
+    # A restarted worker maps the existing snapshot instead of parsing JSON
+    file_loader.clear_cache()
+    store = file_loader.load_cost_store()
+    assert file_loader.get_cache_stats()["snapshot_loads"] == 1
+    assert isinstance(store.amounts.base, np.memmap)
+
+    _write_dataset(dataset, "2.50")
+    stat = os.stat(dataset)
+    os.utime(dataset, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert file_loader.load_cost_store().amounts.tolist() == [2.5]
+    assert len(list((dataset.parent / ".snapshots").iterdir())) == 1
+
+
+def test_snapshot_is_world_readable_and_incomplete_ones_are_rebuilt(dataset):
+    file_loader.load_cost_store()
+    (snapshot,) = (dataset.parent / ".snapshots").iterdir()
+    assert snapshot.stat().st_mode & 0o777 == 0o755
+
+    # e.g. removed as stale by another worker between reading meta.json and the arrays
+    (snapshot / "matrix.npy").unlink()
+    file_loader.clear_cache()
+    store = file_loader.load_cost_store()
+    assert store.amounts.tolist() == [1.0]
+    assert store.matrix.values.tolist() == [[1.0]]
+
+    # Served from the repaired snapshot, not an in-memory fallback
+    assert (snapshot / "matrix.npy").exists()
+    assert isinstance(store.matrix.values, np.memmap)
+    assert isinstance(store.amounts.base, np.memmap)
+    assert [path.name for path in (dataset.parent / ".snapshots").iterdir()] == [snapshot.name]
+
+    file_loader.clear_cache()
+    file_loader.load_cost_store()
+    assert file_loader.get_cache_stats()["snapshot_loads"] == 1
+
+
+def test_analytics_read_the_store_without_parsing_json(dataset):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    file_loader.load_cost_store()
+    assert TestClient(app).get("/api/services").json() == {"services": ["Amazon EC2"]}
+    # Only the data source endpoints need the parsed dict
+    assert file_loader._cache[str(dataset)]["data"] is None
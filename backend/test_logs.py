@@ -0,0 +1,81 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from fastapi.testclient import TestClient
+
+from db import get_session
+from dependencies import get_current_user
+from main import app
+from models import Base, CostLog
+
+
+@pytest.fixture
+def client(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'logs.db'}")
+    Session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with Session() as session:
+            # 3 services per day for 10 days, inserted newest day first
+            session.add_all(
+                CostLog(date=date(2024, 6, 10) - timedelta(days=d), service=service, amount=float(d + i))
+                for d in range(10) for i, service in enumerate(["Amazon EC2", "Amazon S3", "AWS Lambda"])
+            )
+            await session.commit()
+
+    async def override_session():
+        async with Session() as session:
+            yield session
+
+    asyncio.run(setup())
+    app.dependency_overrides[get_session] = override_session
+    app.dependency_overrides[get_current_user] = lambda: None
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    asyncio.run(engine.dispose())
+
+
+def test_logs_keyset_pages_cover_all_rows_in_order(client):
+    seen, cursor = [], None
+    while True:
+        r = client.get("/api/logs", params={"limit": 7, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200
+        assert len(r.json()) <= 7
+        seen += r.json()
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert len(seen) == 30
+    assert [(log["date"], log["id"]) for log in seen] == sorted((log["date"], log["id"]) for log in seen)
+    assert set(seen[0]) == {"id", "date", "service", "amount", "source"}
+
+
+def test_logs_filters_and_descending_order(client):
+    r = client.get("/api/logs", params={
+        "service": "Amazon S3", "start_date": "2024-06-03", "end_date": "2024-06-08", "min_amount": 3, "order": "desc"
+    })
+    logs = r.json()
+    assert [log["date"] for log in logs] == ["2024-06-08", "2024-06-07", "2024-06-06", "2024-06-05", "2024-06-04", "2024-06-03"]
+    assert all(log["service"] == "Amazon S3" and log["amount"] >= 3 for log in logs)
+    assert "X-Next-Cursor" not in r.headers
+
+    assert client.get("/api/logs", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_logs_aggregate(client):
+    r = client.get("/api/logs/aggregate", params={"by": "service", "start_date": "2024-06-09"})
+    assert r.json() == {"by": "service", "totals": [
+        {"service": "AWS Lambda", "total_amount": 5.0, "count": 2},
+        {"service": "Amazon EC2", "total_amount": 1.0, "count": 2},
+        {"service": "Amazon S3", "total_amount": 3.0, "count": 2},
+    ]}
+
+    days = client.get("/api/logs/aggregate", params={"by": "day"}).json()["totals"]
+    assert len(days) == 10
+    assert days[0] == {"date": "2024-06-01", "total_amount": 30.0, "count": 3}
@@ -0,0 +1,347 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.file_loader import load_mock_cost_data, load_cost_store, convert_aws_data_to_flat_format
+import ml_utils
+from ml_utils import (
+    RollingAnomalyDetector,
+    cluster_services,
+    detect_anomalies,
+    forecast_cost_store,
+    forecast_costs,
+    generate_recommendations,
+    get_cost_matrix,
+    preprocess_cost_data,
+    rolling_z_scores,
+    summarize_anomaly_thresholds,
+    sweep_cluster_counts,
+)
+
+
+def _reference_anomalies(pivot_df, z_threshold):
+    # Straightforward per-service / per-date version of the z-score detection
+    anomalies = {}
+    for service in pivot_df.columns:
+        values = pivot_df[service]
+        std = values.std()
+        if std == 0:
+            continue
+        for date, z in ((values - values.mean()) / std).items():
+            if abs(z) >= z_threshold:
+                anomalies.setdefault(service, []).append(
+                    {"date": date, "amount": float(values[date]), "z_score": round(float(z), 2)}
+                )
+    return anomalies
+
+
+def test_vectorized_anomalies_match_reference():
+    data = load_mock_cost_data()
+    pivot_df = preprocess_cost_data(data)
+    for threshold in (0.5, 1.5, 2.0, 3.0):
+        assert detect_anomalies(data, z_threshold=threshold) == _reference_anomalies(pivot_df, threshold)
+
+
+def test_anomalies_skip_constant_services_and_empty_data():
+    data = {
+        "ResultsByTime": [
+            {"TimePeriod": {"Start": f"2024-06-0{i}"}, "Groups": [
+                {"Keys": ["Flat"], "Metrics": {"UnblendedCost": {"Amount": "1.00"}}},
+                {"Keys": ["Spiky"], "Metrics": {"UnblendedCost": {"Amount": "50.00" if i == 5 else "1.00"}}},
+            ]}
+            for i in range(1, 8)
+        ]
+    }
+    anomalies = detect_anomalies(data, z_threshold=2.0)
+    assert list(anomalies) == ["Spiky"]
+    assert anomalies["Spiky"][0]["date"] == "2024-06-05"
+
+    assert detect_anomalies({"ResultsByTime": []}) == {}
+
+
+def test_threshold_summary_matches_individual_detection():
+    data = load_mock_cost_data()
+    thresholds = [0.25, 0.5, 1.0, 1.75, 2.0, 2.5, 3.3]
+    summary = summarize_anomaly_thresholds(data, thresholds)
+    for threshold in thresholds:
+        anomalies = detect_anomalies(data, z_threshold=threshold)
+        assert summary[f"threshold_{threshold}"] == {
+            "total_anomalies": sum(len(points) for points in anomalies.values()),
+            "services_affected": len(anomalies),
+            "services": list(anomalies.keys()),
+        }
+
+
+def test_filtered_anomalies_match_reference_on_sliced_data():
+    data = load_mock_cost_data()
+    df = convert_aws_data_to_flat_format(data)
+    df = df[(df["date"] >= "2024-09-01") & (df["date"] <= "2025-03-31") & (df["service"] == "Amazon EC2")]
+    df = df.assign(date=df["date"].dt.strftime("%Y-%m-%d"))
+    expected = _reference_anomalies(df.pivot(index="date", columns="service", values="amount"), 1.5)
+
+    result = detect_anomalies(
+        data, z_threshold=1.5, start_date=date(2024, 9, 1), end_date=date(2025, 3, 31), service="Amazon EC2"
+    )
+    assert result == expected
+    assert detect_anomalies(data, service="Unknown service") == {}
+    assert detect_anomalies(data, start_date=date(2030, 1, 1)) == {}
+
+
+def test_filtered_anomalies_skip_days_without_service_records():
+    groups = lambda amount: [{"Keys": ["Amazon S3"], "Metrics": {"UnblendedCost": {"Amount": amount}}}]
+    data = {"ResultsByTime": [
+        {"TimePeriod": {"Start": "2024-06-01"}, "Groups": groups("1.00")},
+        {"TimePeriod": {"Start": "2024-06-02"}, "Groups": [{"Keys": ["Amazon EC2"], "Metrics": {"UnblendedCost": {"Amount": "5.00"}}}]},
+        {"TimePeriod": {"Start": "2024-06-03"}, "Groups": groups("1.00")},
+        {"TimePeriod": {"Start": "2024-06-04"}, "Groups": groups("3.00")},
+    ]}
+    # The day without an S3 record must not count as a $0 day
+    anomalies = detect_anomalies(data, z_threshold=1.1, service="Amazon S3")
+    assert [point["date"] for point in anomalies["Amazon S3"]] == ["2024-06-04"]
+    assert detect_anomalies(data, z_threshold=1.2, service="Amazon S3") == {}
+
+
+def test_rolling_detector_matches_trailing_window_statistics():
+    matrix = get_cost_matrix(load_mock_cost_data())
+    window = 14
+    _, z_scores = rolling_z_scores(load_mock_cost_data(), window)
+
+    # Reference: mean/std of the previous `window` days (current day excluded)
+    frame = matrix.frame()
+    trailing = frame.shift(1).rolling(window)
+    expected = ((frame - trailing.mean()) / trailing.std()).to_numpy()
+    assert np.isnan(z_scores[:window]).all()
+    assert np.allclose(z_scores, expected, equal_nan=True)
+
+
+def test_rolling_detector_scores_new_points_incrementally():
+    detector = RollingAnomalyDetector(["A", "B"], window=3)
+    for day in ([1.0, 5.0], [2.0, 5.0]):
+        detector.update(np.array(day))
+    # Fewer than min_periods (default: window) days seen yet
+    assert np.isnan(detector.score(np.array([6.0, 9.0]))).all()
+
+    for day in ([3.0, 5.0], [4.0, 5.0]):
+        detector.update(np.array(day))
+    # Window now holds days 2..4: A = [2, 3, 4] (mean 3, std 1), B is constant
+    z_scores = detector.score(np.array([6.0, 9.0]))
+    assert z_scores[0] == pytest.approx(3.0)
+    assert np.isnan(z_scores[1])
+
+
+def test_rolling_z_scores_extend_the_previous_version(monkeypatch):
+    from utils.cost_store import build_cost_store
+
+    days = load_mock_cost_data()["ResultsByTime"]
+    previous = build_cost_store({"ResultsByTime": days[:-20]})
+    rolling_z_scores(previous, 14)
+
+    # 20 days appended since the previous version
+    store = build_cost_store({"ResultsByTime": days})
+    store.extend_matrix(previous)
+    updates = []
+    original_update = RollingAnomalyDetector.update
+    monkeypatch.setattr(RollingAnomalyDetector, "update", lambda self, day: updates.append(day) or original_update(self, day))
+    detector, z_scores = rolling_z_scores(store, 14)
+    monkeypatch.undo()
+
+    # Only the window before the new days is replayed, not the whole history
+    assert len(updates) == 14 + 20
+    fresh_detector, fresh = rolling_z_scores(build_cost_store({"ResultsByTime": days}), 14)
+    assert np.allclose(z_scores, fresh, equal_nan=True)
+    assert np.allclose(detector.mean, fresh_detector.mean)
+
+
+def test_rolling_z_scores_cache_is_bounded_under_concurrent_windows():
+    from concurrent.futures import ThreadPoolExecutor
+    from utils.cost_store import build_cost_store
+
+    store = build_cost_store(load_mock_cost_data())
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda window: rolling_z_scores(store, window)[1], [w for w in range(2, 26)] * 3))
+
+    assert all(z.shape == store.matrix.shape for z in results)
+    assert store.matrix.derived_cache("rolling").stats()["entries"] == 8
+
+
+def test_rolling_detector_treats_float_residue_on_flat_windows_as_zero_std():
+    detector = RollingAnomalyDetector(["A"], window=30)
+    rng = np.random.default_rng(1)
+    for value in rng.uniform(0, 100, 40).round(2):
+        detector.update(np.array([value]))
+    for _ in range(30):
+        detector.update(np.array([437.19]))
+
+    # The varying days have left the window; m2 is not exactly 0 but the window is flat
+    assert np.isnan(detector.score(np.array([437.20]))).all()
+
+
+def test_batched_forecast_matches_per_service_linear_regression():
+    from sklearn.linear_model import LinearRegression
+
+    records = load_cost_store().records()
+    # Make the services' date sets differ, so more than one batch is solved
+    records = [r for i, r in enumerate(records) if r["service"] != "Amazon S3" or i % 3]
+    result = forecast_costs(records, n_days=10)
+
+    df = pd.DataFrame(records)
+    df["date"] = pd.to_datetime(df["date"])
+    for service in ("Amazon EC2", "Amazon S3"):
+        daily = df[df["service"] == service].groupby("date")["amount"].sum().reset_index()
+        X = np.column_stack([(daily["date"] - daily["date"].min()).dt.days, daily["date"].dt.dayofweek >= 5])
+        model = LinearRegression().fit(X, daily["amount"])
+
+        future = [daily["date"].max() + pd.Timedelta(days=i) for i in range(1, 11)]
+        future_X = [[(d - daily["date"].min()).days, d.dayofweek >= 5] for d in future]
+        expected = np.round(model.predict(future_X), 2)
+
+        points = result["service_forecasts"][service]
+        assert [p["date"] for p in points] == [d.strftime("%Y-%m-%d") for d in future]
+        assert np.allclose([p["predicted_cost"] for p in points], expected, atol=0.01)
+
+
+def test_forecast_cache_reuses_fit_across_horizons(monkeypatch):
+    store = load_cost_store()
+    ml_utils._forecast_cache.invalidate()
+    fits = []
+    fit_forecast_model = ml_utils.fit_forecast_model
+    monkeypatch.setattr(ml_utils, "fit_forecast_model", lambda *args: fits.append(1) or fit_forecast_model(*args))
+
+    week = forecast_cost_store(store, n_days=7)
+    assert forecast_cost_store(store, n_days=7)["total_forecast"] is week["total_forecast"]
+    month = forecast_cost_store(store, n_days=30)
+    assert len(fits) == 1
+    assert month["total_forecast"][:7] == week["total_forecast"]
+
+    forecast_cost_store(store, n_days=7, service="Amazon EC2")
+    assert len(fits) == 2
+    assert month == forecast_costs(store.records(), n_days=30)
+    with pytest.raises(ValueError):
+        forecast_cost_store(store, model="prophet")
+
+
+def test_forecast_cache_is_dropped_when_dataset_reloads(tmp_path, monkeypatch):
+    import json
+    from utils import file_loader
+
+    path = tmp_path / "cost.json"
+    raw = json.loads(json.dumps(load_mock_cost_data()))
+    path.write_text(json.dumps(raw))
+    monkeypatch.setattr(file_loader, "MOCK_DATA_PATH", path)
+    monkeypatch.setattr(file_loader, "SNAPSHOT_ENABLED", False)
+    file_loader.clear_cache()
+    ml_utils._forecast_cache.invalidate()
+    try:
+        before = forecast_cost_store(load_cost_store(), n_days=7)
+        assert ml_utils.get_forecast_cache_stats()["entries"] == 2
+
+        raw["ResultsByTime"][-1]["Groups"][0]["Metrics"]["UnblendedCost"]["Amount"] = "9999.00"
+        path.write_text(json.dumps(raw))
+        after = forecast_cost_store(load_cost_store(), n_days=7)
+
+        assert after["total_forecast"] != before["total_forecast"]
+        assert ml_utils.get_forecast_cache_stats()["entries"] == 2
+    finally:
+        file_loader.clear_cache()
+
+
+def test_parallel_fit_matches_single_process(monkeypatch):
+    from utils import parallel
+
+    monkeypatch.setattr(parallel, "COMPUTE_WORKERS", 2)
+    monkeypatch.setattr(ml_utils, "COMPUTE_WORKERS", 2)
+    rng = np.random.default_rng(0)
+    days = np.repeat(np.arange(19000, 19060), 25)
+    codes = np.tile(np.arange(25), 60)
+    keep = rng.random(len(days)) < 0.9
+    args = (days[keep], codes[keep], rng.uniform(0, 100, keep.sum()), 25)
+
+    try:
+        expected = ml_utils.fit_forecast_model(*args, parallel=False)
+        result = ml_utils.fit_forecast_model(*args, parallel=True)
+    finally:
+        parallel.shutdown_process_pool()
+
+    assert result.keys() == expected.keys()
+    for name in expected:
+        assert np.allclose(result[name], expected[name])
+
+
+def test_clusters_are_shared_and_warm_started_on_new_data():
+    from utils.cost_store import CostMatrix, build_cost_store
+
+    matrix = get_cost_matrix()
+    result = cluster_services(matrix)
+    assert cluster_services(matrix) is result
+    recommendations = generate_recommendations()["recommendations"]
+    labels = dict(zip(matrix.services, result["labels"].tolist()))
+    assert all(r["cluster"] == labels[r["service"]] for r in recommendations)
+
+    # One more day of data: the next dataset version, fitted from the previous version's clusters
+    raw = load_mock_cost_data()
+    extended = {"ResultsByTime": list(raw["ResultsByTime"]) + [
+        {**raw["ResultsByTime"][-1], "TimePeriod": {"Start": "2099-01-01", "End": "2099-01-02"}}
+    ]}
+    store = build_cost_store(extended)
+    store.extend_matrix(load_cost_store())
+    updated = cluster_services(store.matrix)
+    assert updated["warm_started"]
+    assert updated["labels"].tolist() == result["labels"].tolist()
+
+    # Workers that never saw the previous version fit cold and get the same labels
+    for mode in ("full", "minibatch"):
+        for k in (2, 3, 5):
+            cluster_services(matrix, n_clusters=k, mode=mode)
+            seen = cluster_services(store.matrix, n_clusters=k, mode=mode)
+            cold = cluster_services(CostMatrix.from_store(build_cost_store(extended)), n_clusters=k, mode=mode)
+            assert seen["warm_started"] == (mode == "full") and not cold["warm_started"]
+            assert cold["labels"].tolist() == seen["labels"].tolist()
+
+
+def test_cluster_cache_is_bounded_under_concurrent_fits():
+    from concurrent.futures import ThreadPoolExecutor
+    from utils.cost_store import build_cost_store
+
+    matrix = build_cost_store(load_mock_cost_data()).matrix
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda k: cluster_services(matrix, n_clusters=k, mode="full"), [2, 3, 4, 5, 6] * 2))
+
+    assert all(len(set(r["labels"].tolist())) == k for r, k in zip(results, [2, 3, 4, 5, 6] * 2))
+    assert matrix.derived_cache("clusters").stats()["entries"] == 5
+    for k in range(7, 12):
+        cluster_services(matrix, n_clusters=k, mode="full")
+    assert matrix.derived_cache("clusters").stats()["entries"] == 8
+
+
+def test_minibatch_clustering_mode():
+    result = cluster_services(get_cost_matrix(), n_clusters=3, mode="minibatch")
+    assert result["mode"] == "minibatch"
+    assert result["labels"].shape == (len(get_cost_matrix().services),)
+    assert set(result["labels"].tolist()) <= {0, 1, 2}
+    with pytest.raises(ValueError):
+        cluster_services(get_cost_matrix(), mode="spectral")
+
+
+def test_cluster_count_sweep_is_cached_and_parallel_matches_serial(monkeypatch):
+    from utils import parallel
+    from utils.cost_store import CostMatrix, build_cost_store
+
+    matrix = get_cost_matrix()
+    sweep = sweep_cluster_counts(matrix, k_min=2, k_max=5, pca_components=4)
+    assert sweep_cluster_counts(matrix, k_min=2, k_max=5, pca_components=4) is sweep
+    assert [c["k"] for c in sweep["candidates"]] == [2, 3, 4, 5]
+    assert sweep["dimensions"] == 4
+    assert sweep["best_k"] == max(sweep["candidates"], key=lambda c: c["silhouette"])["k"]
+
+    monkeypatch.setattr(parallel, "COMPUTE_WORKERS", 2)
+    monkeypatch.setattr(ml_utils, "CLUSTER_SWEEP_PARALLEL_MIN_CELLS", 0)
+    fresh = CostMatrix.from_store(build_cost_store(load_mock_cost_data()))
+    try:
+        parallel_sweep = sweep_cluster_counts(fresh, k_min=2, k_max=5, pca_components=4)
+    finally:
+        parallel.shutdown_process_pool()
+    for a, b in zip(sweep["candidates"], parallel_sweep["candidates"]):
+        assert a["labels"].tolist() == b["labels"].tolist()
+        assert a["silhouette"] == pytest.approx(b["silhouette"])
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+# Threads running analytics off the event loop (0 runs them inline, for debugging/benchmarks).
+# NumPy/BLAS release the GIL for the heavy parts, so a few threads keep the loop responsive.
+COMPUTE_THREADS = int(os.getenv("COMPUTE_THREADS", str(min(4, os.cpu_count() or 1))))
+# Analytics requests allowed at once (running + queued); more are rejected with 429
+COMPUTE_QUEUE_LIMIT = int(os.getenv("COMPUTE_QUEUE_LIMIT", "32"))
+
+_executor_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_stats_lock = threading.Lock()
+_stats = {"in_flight": 0, "completed": 0, "rejected": 0}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=COMPUTE_THREADS, thread_name_prefix="compute")
+        return _executor
+
+
+async def run_compute(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a CPU-bound function on the bounded compute executor and await its result.
+
+    Raises:
+        HTTPException: 429 when COMPUTE_QUEUE_LIMIT requests are already running or queued
+    """
+    with _stats_lock:
+        if _stats["in_flight"] >= COMPUTE_QUEUE_LIMIT:
+            _stats["rejected"] += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Too many analytics requests in progress, please retry shortly",
+                headers={"Retry-After": "1"}
+            )
+        _stats["in_flight"] += 1
+
+    if COMPUTE_THREADS <= 0:
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _finished()
+
+    try:
+        future = _get_executor().submit(partial(func, *args, **kwargs))
+    except BaseException:
+        _finished()
+        raise
+    # Counted until the work itself ends: a cancelled await (client gone) leaves the thread running
+    future.add_done_callback(_finished)
+    return await asyncio.wrap_future(future)
+
+
+def _finished(future=None) -> None:
+    with _stats_lock:
+        _stats["in_flight"] -= 1
+        _stats["completed"] += 1
+
+
+def get_compute_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return {**_stats, "threads": COMPUTE_THREADS, "queue_limit": COMPUTE_QUEUE_LIMIT}
+
+
+def shutdown_compute_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(cancel_futures=True)
+            _executor = None
@@ -0,0 +1,708 @@
+import hashlib
+import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from array import array
+from pathlib import Path
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from utils.result_cache import ResultCache
+
+# date.toordinal() of 1970-01-01, used to convert dates to numpy day numbers
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def to_day_number(value) -> int:
+    """Convert a date / ISO string / Timestamp to days since 1970-01-01."""
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    if isinstance(value, pd.Timestamp):
+        value = value.date()
+    return value.toordinal() - EPOCH_ORDINAL
+
+
+class CostStore:
+    """
+    Columnar, read-only view of AWS Cost Explorer cost data.
+
+    One row per (day, service) group of ResultsByTime, kept as parallel NumPy arrays:
+    - date_ordinals: int64 days since 1970-01-01
+    - service_codes: int32 index into `services` (first-seen order)
+    - amounts: float64 UnblendedCost amounts
+    """
+
+    def __init__(
+        self,
+        date_ordinals: np.ndarray,
+        service_codes: np.ndarray,
+        amounts: np.ndarray,
+        services: List[str],
+        days: Optional[np.ndarray] = None,
+        day_positions: Optional[np.ndarray] = None,
+    ):
+        self.date_ordinals = np.ascontiguousarray(date_ordinals, dtype=np.int64)
+        self.service_codes = np.ascontiguousarray(service_codes, dtype=np.int32)
+        self.amounts = np.ascontiguousarray(amounts, dtype=np.float64)
+        self.services = list(services)
+        self.service_names = np.array(self.services, dtype=object)
+
+        # Unique days (sorted) and the position of each row on that day axis
+        # (passed in when loading a snapshot, so nothing has to be recomputed)
+        self.days = np.unique(self.date_ordinals) if days is None else days
+        self.day_labels = np.datetime_as_string(self.days.astype("datetime64[D]")).astype(object)
+        if day_positions is None:
+            day_positions = np.searchsorted(self.days, self.date_ordinals).astype(np.int32)
+        self.day_positions = day_positions
+        self._matrix = None
+        self._previous_matrix = None
+        self._rollup = None
+        self._date_index = None
+        # Guards the lazy matrix/rollup builds (reentrant: the rollup is built from the matrix)
+        self._build_lock = threading.RLock()
+
+        # Dataset version (set by the loader to the source file hash), see `fingerprint`
+        self.version: Optional[str] = None
+        self._fingerprint: Optional[str] = None
+
+        for array in (self.date_ordinals, self.service_codes, self.amounts, self.service_names,
+                      self.days, self.day_labels, self.day_positions):
+            array.setflags(write=False)
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies the data in this store: the dataset version if known, else a hash of the columns."""
+        if self.version is not None:
+            return self.version
+        if self._fingerprint is None:
+            digest = hashlib.sha1()
+            for array in (self.date_ordinals, self.service_codes, self.amounts):
+                digest.update(array.tobytes())
+            digest.update("\x00".join(self.services).encode())
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def service_code(self, service: str) -> Optional[int]:
+        """Return the categorical code for a service name, or None if unknown."""
+        try:
+            return self.services.index(service)
+        except ValueError:
+            return None
+
+    def date_rows(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> np.ndarray:
+        """
+        Row indices (in storage order) dated start_date..end_date (inclusive).
+
+        Uses a sorted date index, so a range costs two binary searches plus the rows in
+        it. Rows are normally stored day by day, in which case a range is a plain slice.
+        """
+        if self._date_index is None:
+            ordinals = self.date_ordinals
+            if np.all(ordinals[:-1] <= ordinals[1:]):
+                self._date_index = (ordinals, None)
+            else:
+                order = np.argsort(ordinals, kind="stable")
+                self._date_index = (ordinals[order], order)
+        sorted_ordinals, order = self._date_index
+
+        start = 0 if start_date is None else int(np.searchsorted(sorted_ordinals, to_day_number(start_date), side="left"))
+        end = len(sorted_ordinals) if end_date is None else int(np.searchsorted(sorted_ordinals, to_day_number(end_date), side="right"))
+        if order is None:
+            return np.arange(start, max(start, end))
+        return np.sort(order[start:end])
+
+    def select(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        service: Optional[str] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+    ) -> np.ndarray:
+        """Return the row indices (in storage order) matching all given filters."""
+        # Date range through the index; the other filters only look at the rows in it
+        rows = self.date_rows(start_date, end_date)
+        mask = np.ones(len(rows), dtype=bool)
+        if service is not None:
+            code = self.service_code(service)
+            if code is None:
+                return np.empty(0, dtype=np.intp)
+            mask &= self.service_codes[rows] == code
+        if min_amount is not None:
+            mask &= self.amounts[rows] >= min_amount
+        if max_amount is not None:
+            mask &= self.amounts[rows] <= max_amount
+        return rows if mask.all() else rows[mask]
+
+    def sort_rows(self, rows: np.ndarray, by: str, ascending: bool = True) -> np.ndarray:
+        """
+        Order row indices by "date", "amount" or "service".
+
+        Same order as DataFrame.sort_values(by, ascending) on to_frame(rows), including
+        its (unstable) quicksort handling of ties, so paging matches the old responses.
+        """
+        if by == "date":
+            keys = self.date_ordinals[rows].astype("datetime64[D]").astype("datetime64[ns]")
+        elif by == "amount":
+            keys = self.amounts[rows]
+        elif by == "service":
+            keys = self.service_names[self.service_codes[rows]]
+        else:
+            raise ValueError(f"Cannot sort by '{by}'")
+        # Sort the same key arrays to_frame() builds, through the same pandas code path
+        order = pd.Series(keys).sort_values(ascending=ascending).index.to_numpy()
+        return rows[order]
+
+    def iter_records(self, rows: np.ndarray, decimals: Optional[int] = None, chunk_size: int = 5000) -> Iterator[List[Dict]]:
+        """Yield records(rows) in chunks, so large results never exist as one list."""
+        for start in range(0, len(rows), chunk_size):
+            yield self.records(rows[start:start + chunk_size], decimals=decimals)
+
+    def records(self, rows: Optional[np.ndarray] = None, decimals: Optional[int] = None) -> List[Dict]:
+        """Return rows as {"date", "service", "amount"} dicts with ISO date strings."""
+        rows = np.arange(len(self)) if rows is None else rows
+        amounts = self.amounts[rows]
+        if decimals is not None:
+            amounts = np.round(amounts, decimals)
+        dates = self.day_labels[self.day_positions[rows]].tolist()
+        services = self.service_names[self.service_codes[rows]].tolist()
+        return [
+            {"date": d, "service": s, "amount": a}
+            for d, s, a in zip(dates, services, amounts.tolist())
+        ]
+
+    def to_frame(self, rows: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """Return rows as a flat DataFrame with columns: date (datetime64), service, amount."""
+        rows = np.arange(len(self)) if rows is None else rows
+        return pd.DataFrame({
+            "date": self.date_ordinals[rows].astype("datetime64[D]").astype("datetime64[ns]"),
+            "service": self.service_names[self.service_codes[rows]],
+            "amount": self.amounts[rows],
+        })
+
+    def totals_by_service(self, rows: Optional[np.ndarray] = None) -> Dict[str, float]:
+        """Sum amounts per service (first-seen order), only for services present in rows."""
+        codes = self.service_codes if rows is None else self.service_codes[rows]
+        amounts = self.amounts if rows is None else self.amounts[rows]
+        totals = np.bincount(codes, weights=amounts, minlength=len(self.services))
+        present = np.bincount(codes, minlength=len(self.services)) > 0
+        return {self.services[i]: float(totals[i]) for i in np.flatnonzero(present)}
+
+    @property
+    def matrix(self) -> "CostMatrix":
+        """Dense dates x services matrix, built on first use and cached on the store."""
+        if self._matrix is None:
+            with self._build_lock:
+                if self._matrix is None:
+                    matrix = CostMatrix.from_store(self)
+                    matrix.previous, self._previous_matrix = self._previous_matrix, None
+                    self._matrix = matrix
+        return self._matrix
+
+    @property
+    def rollup(self) -> "CostRollup":
+        """Per-service prefix sums over the day axis, built on first use and cached on the store."""
+        if self._rollup is None:
+            with self._build_lock:
+                if self._rollup is None:
+                    self._rollup = CostRollup.from_store(self)
+        return self._rollup
+
+    def extend_rollup(self, previous: "CostStore") -> None:
+        """
+        Build this store's rollup from an older version of the same dataset, recomputing
+        prefix sums only from the first day that differs (e.g. newly appended days).
+        """
+        with self._build_lock:
+            if self._rollup is None and previous._rollup is not None:
+                self._rollup = CostRollup.from_store(self, previous)
+
+    def extend_matrix(self, previous: "CostStore") -> None:
+        """
+        Link an older version's matrix (if it was built) as this store's matrix.previous,
+        so results cached on it can be extended from the first day that differs instead
+        of rebuilt. Only one version back is kept: the older matrix's own link is dropped.
+        """
+        if previous._matrix is None:
+            return
+        previous._matrix.previous = None
+        with self._build_lock:
+            if self._matrix is not None:
+                self._matrix.previous = previous._matrix
+            else:
+                self._previous_matrix = previous._matrix
+
+    def range_totals(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, float]:
+        """
+        Like totals_by_service(select(start_date, end_date)), but from the rollup in
+        O(services): per-service totals (first-seen order) of services with records in range.
+        """
+        sums, counts = self.rollup.totals(start_date, end_date)
+        columns = self.rollup.column_of_code
+        return {
+            service: float(sums[column])
+            for service, column in zip(self.services, columns.tolist())
+            if counts[column] > 0
+        }
+
+    def top_services(
+        self, k: int, start_date: Optional[date] = None, end_date: Optional[date] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        The k services with the highest totals in the range, largest first (ties in
+        first-seen order, so k=1 matches max() over range_totals).
+
+        Selection is np.argpartition over the rollup totals, O(services) rather than a sort;
+        only the selected (and tied) services are ordered.
+        """
+        sums, counts = self.rollup.totals(start_date, end_date)
+        columns = self.rollup.column_of_code
+        codes = np.flatnonzero(counts[columns] > 0)
+        totals = sums[columns[codes]]
+        if k <= 0 or len(codes) == 0:
+            return []
+
+        if k < len(codes):
+            # kth largest total; keep everything tied with it so ties resolve by first-seen order
+            kth = totals[np.argpartition(totals, len(codes) - k)[len(codes) - k]]
+            keep = totals >= kth
+            codes, totals = codes[keep], totals[keep]
+
+        order = np.lexsort((codes, -totals))[:k]
+        return [(self.services[code], float(total)) for code, total in zip(codes[order].tolist(), totals[order].tolist())]
+
+    def pivot_frame(self) -> pd.DataFrame:
+        """Return a dates x services cost DataFrame (ISO date index, sorted service columns, 0 fill)."""
+        return self.matrix.frame()
+
+
+# Magic bytes of the binary service vectors payload (CostMatrix.service_vectors_binary)
+SERVICE_VECTORS_MAGIC = b"ISCV"
+
+
+class CostMatrix:
+    """
+    Read-only dense cost matrix shared by all analytics.
+
+    - values: float64 C-contiguous array, shape (n_dates, n_services), 0 where no cost was recorded
+    - dates: ISO date labels for the rows (sorted)
+    - day_numbers: int64 days since 1970-01-01 for the rows
+    - services: service names for the columns (sorted)
+
+    Slice `values` (e.g. values[:, j] or values[a:b]) instead of re-pivoting the flat data.
+    """
+
+    def __init__(self, values: np.ndarray, dates: np.ndarray, day_numbers: np.ndarray, services: List[str]):
+        self.values = values
+        self.dates = dates
+        self.day_numbers = day_numbers
+        self.services = list(services)
+        self.values.setflags(write=False)
+
+        # Results derived from this exact matrix (dropped with it when the dataset reloads)
+        self.derived: Dict = {}
+        self._derived_lock = threading.Lock()
+        # The previous version's matrix after a reload (see CostStore.extend_matrix)
+        self.previous: Optional[CostMatrix] = None
+
+    @classmethod
+    def from_store(cls, store: CostStore) -> "CostMatrix":
+        order = np.argsort(store.service_names, kind="stable")
+        column_of_code = np.empty(len(store.services), dtype=np.intp)
+        column_of_code[order] = np.arange(len(order))
+
+        # Sum into the matrix (multiple records per day/service are added together)
+        values = np.zeros((len(store.days), len(store.services)), dtype=np.float64)
+        np.add.at(values, (store.day_positions, column_of_code[store.service_codes]), store.amounts)
+
+        return cls(values, store.day_labels, store.days, store.service_names[order].tolist())
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def derived_cache(self, name: str, max_entries: int = 8) -> ResultCache:
+        """
+        Thread-safe LRU in `derived` for results computed from this matrix, kept to
+        max_entries (their size is bounded by the matrix itself, not by bytes).
+        """
+        with self._derived_lock:
+            cache = self.derived.get(name)
+            if cache is None:
+                cache = self.derived[name] = ResultCache(max_entries=max_entries, max_bytes=sys.maxsize)
+            return cache
+
+    def unchanged_rows(self, older: "CostMatrix") -> int:
+        """Number of leading rows identical in an older matrix of the dataset (0 if its services differ)."""
+        n = len(older.day_numbers)
+        if older.services != self.services or n > len(self.day_numbers) \
+                or not np.array_equal(older.day_numbers, self.day_numbers[:n]):
+            return 0
+        unchanged = (older.values == self.values[:n]).all(axis=1)
+        return n if unchanged.all() else int(np.argmin(unchanged))
+
+    def date_range(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> slice:
+        """Row slice covering start_date..end_date (inclusive), found by binary search on the sorted dates."""
+        start = 0 if start_date is None else int(np.searchsorted(self.day_numbers, to_day_number(start_date), side="left"))
+        end = len(self.day_numbers) if end_date is None else int(np.searchsorted(self.day_numbers, to_day_number(end_date), side="right"))
+        return slice(start, max(start, end))
+
+    def column(self, service: str) -> np.ndarray:
+        """Return the (read-only) daily cost vector of one service."""
+        return self.values[:, self.services.index(service)]
+
+    def frame(self, datetime_index: bool = False) -> pd.DataFrame:
+        """Wrap the matrix in a DataFrame without copying (rows = date, columns = service)."""
+        if datetime_index:
+            index = pd.DatetimeIndex(self.day_numbers.astype("datetime64[D]").astype("datetime64[ns]"), name="date")
+        else:
+            index = pd.Index(self.dates, name="date")
+        return pd.DataFrame(self.values, index=index, columns=pd.Index(self.services, name="service"), copy=False)
+
+    def service_vectors_binary(self, metadata: Optional[Dict] = None) -> bytes:
+        """
+        Encode the per-service daily cost vectors for binary transfer.
+
+        Layout: b"ISCV", uint32 (little-endian) header length, UTF-8 JSON header
+        (dates, services, shape, dtype, plus `metadata`), zero padding to a multiple of
+        8 bytes, then the float64 little-endian values as a (services x dates) row-major
+        array, ready for a Float64Array view on the client.
+        """
+        header = {
+            **(metadata or {}),
+            "dates": list(self.dates),
+            "services": self.services,
+            "shape": [len(self.services), len(self.dates)],
+            "dtype": "<f8"
+        }
+        encoded = json.dumps(header).encode("utf-8")
+        prefix_length = len(SERVICE_VECTORS_MAGIC) + 4 + len(encoded)
+        padding = b"\0" * (-prefix_length % 8)
+        values = np.ascontiguousarray(self.values.T, dtype="<f8")
+        return b"".join([SERVICE_VECTORS_MAGIC, struct.pack("<I", len(encoded)), encoded, padding, values.tobytes()])
+
+
+class CostRollup:
+    """
+    Per-service prefix sums over the day axis of a store's cost matrix.
+
+    - days: sorted day numbers (the matrix rows)
+    - services: column names (sorted, as in CostMatrix); column_of_code maps store service codes
+    - sums / counts: (n_days + 1, n_services); row i holds each service's total cost /
+      record count over days[:i]
+
+    Any day range total is one subtraction (sums[b] - sums[a]), so range totals,
+    top services and weekly/monthly rollups cost O(services) per period instead of a
+    scan over the records.
+    """
+
+    PERIODS = ("day", "week", "month")
+
+    def __init__(self, days: np.ndarray, services: List[str], column_of_code: np.ndarray,
+                 sums: np.ndarray, counts: np.ndarray):
+        self.days = days
+        self.services = services
+        self.column_of_code = column_of_code
+        self.sums = sums
+        self.counts = counts
+        for array in (self.column_of_code, self.sums, self.counts):
+            array.setflags(write=False)
+
+    @classmethod
+    def from_store(cls, store: CostStore, previous: Optional[CostStore] = None) -> "CostRollup":
+        matrix = store.matrix
+        n_days, n_services = matrix.shape
+        column_of_code = np.empty(len(store.services), dtype=np.intp)
+        column_of_code[np.argsort(store.service_names, kind="stable")] = np.arange(len(store.services))
+
+        # Records per (day, service), for "has data in range" (a total of 0 is still data)
+        flat = store.day_positions.astype(np.intp) * n_services + column_of_code[store.service_codes]
+        day_counts = np.bincount(flat, minlength=n_days * n_services).reshape(n_days, n_services)
+
+        sums = np.zeros((n_days + 1, n_services))
+        counts = np.zeros((n_days + 1, n_services), dtype=np.int64)
+
+        # Reuse the previous version's prefix rows up to the first day that changed
+        reuse = 0
+        old = previous.rollup if previous is not None and previous._rollup is not None else None
+        if old is not None and old.services == matrix.services and len(old.days) <= n_days \
+                and np.array_equal(old.days, matrix.day_numbers[:len(old.days)]):
+            unchanged = (
+                (previous.matrix.values == matrix.values[:len(old.days)])
+                & (np.diff(old.counts, axis=0) == day_counts[:len(old.days)])
+            ).all(axis=1)
+            reuse = len(old.days) if unchanged.all() else int(np.argmin(unchanged))
+            sums[:reuse + 1] = old.sums[:reuse + 1]
+            counts[:reuse + 1] = old.counts[:reuse + 1]
+
+        np.cumsum(matrix.values[reuse:], axis=0, out=sums[reuse + 1:])
+        sums[reuse + 1:] += sums[reuse]
+        np.cumsum(day_counts[reuse:], axis=0, out=counts[reuse + 1:])
+        counts[reuse + 1:] += counts[reuse]
+        return cls(matrix.day_numbers, matrix.services, column_of_code, sums, counts)
+
+    def day_range(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Tuple[int, int]:
+        """Prefix row bounds (a, b) of start_date..end_date (inclusive), by binary search."""
+        a = 0 if start_date is None else int(np.searchsorted(self.days, to_day_number(start_date), side="left"))
+        b = len(self.days) if end_date is None else int(np.searchsorted(self.days, to_day_number(end_date), side="right"))
+        return a, max(a, b)
+
+    def totals(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(sums, counts) per service column over start_date..end_date."""
+        a, b = self.day_range(start_date, end_date)
+        return self.sums[b] - self.sums[a], self.counts[b] - self.counts[a]
+
+    def by_period(
+        self, period: str, start_date: Optional[date] = None, end_date: Optional[date] = None
+    ) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Totals per calendar period ("day", "week" starting Monday, or "month") within the range.
+
+        Returns:
+            (labels, sums, counts): period labels (ISO date the day/week starts on, or
+            YYYY-MM) and (periods x services) totals / record counts
+        """
+        if period not in self.PERIODS:
+            raise ValueError(f"Unknown rollup period '{period}'")
+        a, b = self.day_range(start_date, end_date)
+        days = self.days[a:b]
+        if period == "week":
+            keys = days - (days + 3) % 7  # 1970-01-01 was a Thursday
+        elif period == "month":
+            keys = days.astype("datetime64[D]").astype("datetime64[M]")
+        else:
+            keys = days
+
+        # Days with data only: each period spans the rows from its first day to the next period's
+        starts = np.concatenate([[0], np.flatnonzero(keys[1:] != keys[:-1]) + 1]) if len(days) else np.empty(0, dtype=np.intp)
+        ends = np.append(starts[1:], len(days))
+        if period == "month":
+            labels = np.datetime_as_string(keys[starts]).tolist()
+        else:
+            labels = np.datetime_as_string(keys[starts].astype("datetime64[D]")).tolist()
+        return labels, self.sums[a + ends] - self.sums[a + starts], self.counts[a + ends] - self.counts[a + starts]
+
+
+# Binary snapshot: one .npy file per array (memory-mapped on load) plus meta.json
+SNAPSHOT_FORMAT = 1
+_SNAPSHOT_ARRAYS = ("date_ordinals", "service_codes", "amounts", "days", "day_positions")
+
+
+def save_snapshot(store: CostStore, directory, source_digest: str) -> None:
+    """
+    Write store (and its dense matrix) as a snapshot directory.
+
+    Files are written to a temporary sibling directory and renamed into place, so
+    concurrent workers never see a half-written snapshot.
+    """
+    directory = Path(directory)
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{directory.name}-", dir=directory.parent))
+    try:
+        for name in _SNAPSHOT_ARRAYS:
+            np.save(tmp_dir / f"{name}.npy", getattr(store, name))
+        np.save(tmp_dir / "matrix.npy", store.matrix.values)
+        with open(tmp_dir / "meta.json", "w") as f:
+            json.dump({
+                "format": SNAPSHOT_FORMAT,
+                "source_digest": source_digest,
+                "rows": len(store),
+                "services": store.services,
+            }, f)
+        # mkdtemp creates the directory owner-only; workers may run as other users
+        os.chmod(tmp_dir, 0o755)
+        _publish_snapshot(tmp_dir, directory, source_digest)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def _publish_snapshot(tmp_dir: Path, directory: Path, source_digest: str) -> None:
+    """
+    Rename a written snapshot into place. A valid snapshot published there first (by another
+    worker) is kept; an incomplete or unreadable one is moved aside and replaced.
+    """
+    try:
+        os.rename(tmp_dir, directory)
+        return
+    except OSError:
+        if load_snapshot(directory, source_digest) is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+
+    # Rename the broken snapshot out of the way first (readers may still map its files)
+    trash = Path(tempfile.mkdtemp(prefix=f".{directory.name}-broken-", dir=directory.parent))
+    try:
+        os.rename(directory, trash / directory.name)
+    except FileNotFoundError:
+        pass
+    shutil.rmtree(trash, ignore_errors=True)
+
+    try:
+        os.rename(tmp_dir, directory)
+    except OSError:
+        if load_snapshot(directory, source_digest) is None:
+            raise
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def load_snapshot(directory, source_digest: Optional[str] = None) -> Optional[CostStore]:
+    """Memory-map a snapshot directory; returns None if missing, incomplete, stale or from another format."""
+    directory = Path(directory)
+    try:
+        with open(directory / "meta.json") as f:
+            meta = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if meta.get("format") != SNAPSHOT_FORMAT:
+        return None
+    if source_digest is not None and meta.get("source_digest") != source_digest:
+        return None
+
+    # Another worker may remove a stale snapshot (or be replacing it) while we read
+    try:
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode="r") for name in _SNAPSHOT_ARRAYS}
+        values = np.load(directory / "matrix.npy", mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    store = CostStore(services=meta["services"], **arrays)
+    store._matrix = CostMatrix(values, store.day_labels, store.days, sorted(store.services))
+    return store
+
+
+def build_cost_store(raw_data: Dict) -> CostStore:
+    """Build a CostStore from AWS Cost Explorer format (ResultsByTime/Groups)."""
+    return _build_from_days(raw_data.get("ResultsByTime", []))
+
+
+def stream_cost_store(file_path, chunk_size: int = 1 << 20) -> CostStore:
+    """
+    Build a CostStore straight from a Cost Explorer JSON file without loading the whole document.
+
+    ResultsByTime entries are decoded one at a time and appended to compact typed buffers,
+    so peak memory is roughly the output arrays plus one day entry and one read chunk.
+    """
+    with open(file_path, "r") as f:
+        return _build_from_days(iter_results_by_time(f, chunk_size))
+
+
+def _build_from_days(days: Iterable[Dict]) -> CostStore:
+    """Append ResultsByTime day entries into columnar buffers and wrap them in a CostStore."""
+    services: Dict[str, int] = {}
+    date_ordinals = array("q")
+    codes = array("i")
+    amounts = array("d")
+
+    for day in days:
+        groups = day.get("Groups", [])
+        day_number = to_day_number(day["TimePeriod"]["Start"])
+        date_ordinals.extend([day_number] * len(groups))
+        for group in groups:
+            service = group["Keys"][0]
+            code = services.get(service)
+            if code is None:
+                code = services[service] = len(services)
+            codes.append(code)
+        amounts.extend(map(float, (group["Metrics"]["UnblendedCost"]["Amount"] for group in groups)))
+
+    return CostStore(
+        date_ordinals=np.frombuffer(date_ordinals, dtype=np.int64),
+        service_codes=np.frombuffer(codes, dtype=np.int32),
+        amounts=np.frombuffer(amounts, dtype=np.float64),
+        services=list(services),
+    )
+
+
+_WHITESPACE = " \t\n\r"
+
+
+class _JSONStream:
+    """Minimal incremental reader over a text file for decoding one JSON value at a time."""
+
+    def __init__(self, f: TextIO, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        # Drop consumed text, then read at least as much as is still buffered (amortised O(n))
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        chunk = self.f.read(max(self.chunk_size, len(self.buffer)))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer += chunk
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ('' at end of file)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.buffer, self.pos)
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number at the very end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+def iter_results_by_time(f: TextIO, chunk_size: int = 1 << 20) -> Iterator[Dict]:
+    """Yield the entries of the top-level "ResultsByTime" array one at a time."""
+    stream = _JSONStream(f, chunk_size)
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        if key == "ResultsByTime":
+            stream.expect("[")
+            if stream.peek() == "]":
+                stream.pos += 1
+            else:
+                while True:
+                    yield stream.value()
+                    if stream.peek() == ",":
+                        stream.pos += 1
+                        continue
+                    stream.expect("]")
+                    break
+        else:
+            # Other top-level keys (GroupDefinitions, NextPageToken, ...) are small: decode and drop
+            stream.value()
+        if stream.peek() == ",":
+            stream.pos += 1
+            continue
+        stream.expect("}")
+        return
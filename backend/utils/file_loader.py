@@ -1,21 +1,270 @@
 import json
 import os
+import hashlib
+import shutil
+import threading
 from pathlib import Path
 import pandas as pd
 from fastapi import HTTPException
-from typing import Dict, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
 from dotenv import load_dotenv
+from utils.cost_store import CostStore, build_cost_store, stream_cost_store, save_snapshot, load_snapshot
 
 # Load environment variables
 load_dotenv()
 
+MOCK_DATA_PATH = Path(__file__).parents[1] / "aws" / "mock_cost_data.json"
+
+# Binary (memory-mapped) snapshots of the columnar dataset, shared by all workers on a host.
+# Defaults to a .snapshots folder next to the source file; disable for read-only deploys.
+SNAPSHOT_ENABLED = os.getenv("COST_SNAPSHOT_ENABLED", "true").lower() == "true"
+SNAPSHOT_DIR = os.getenv("COST_SNAPSHOT_DIR")
+
+
+class FrozenDict(dict):
+    """
+    Read-only dict used for the shared cached dataset (still JSON serializable).
+
+    The JSON parser builds these directly (object_pairs_hook=FrozenDict.from_pairs), with
+    lists turned into tuples, so there is no second pass copying the tree. copy.copy,
+    copy.deepcopy and pickle give plain dicts (deepcopy: fully mutable, see thaw()).
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Cached cost data is read-only")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    @classmethod
+    def from_pairs(cls, pairs: list) -> "FrozenDict":
+        return cls([(key, _freeze_list(value) if type(value) is list else value) for key, value in pairs])
+
+    def __copy__(self) -> dict:
+        return dict(self)
+
+    def __deepcopy__(self, memo) -> dict:
+        return thaw(self)
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+def _freeze_list(values: list) -> tuple:
+    return tuple(_freeze_list(v) if type(v) is list else v for v in values)
+
+
+def thaw(value):
+    """Mutable deep copy of cached data (plain dicts and lists)."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+# Process-wide cache of parsed data files: path -> entry
+# Every route shares the same parsed (read-only) object, and a file is only
+# re-parsed when its mtime/size changes AND its content hash differs.
+# An entry holds the parsed dict and/or the columnar CostStore, each built lazily
+# under the entry's own lock (_cache_lock only guards the index and the counters).
+_cache_lock = threading.Lock()
+_cache: Dict[str, dict] = {}
+_cache_stats = {"hits": 0, "misses": 0, "reloads": 0, "snapshot_loads": 0, "snapshot_builds": 0}
+
+# Callbacks run with the old dataset version whenever a cached file is reloaded
+_reload_listeners: List[Callable[[str], None]] = []
+
+
+def on_dataset_reload(callback: Callable[[str], None]) -> None:
+    """Register callback(old_version) to drop results derived from a dataset that changed."""
+    _reload_listeners.append(callback)
+
+
+def _file_digest(file_path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _swap_entry(file_path: Path, signature: tuple, digest: str) -> Tuple[dict, Optional[str]]:
+    """
+    Return the cache entry for file_path given its current signature and content hash,
+    replacing the entry if the content changed. Also returns the old version if this call
+    replaced it (else None). Caller must hold _cache_lock.
+    """
+    key = str(file_path)
+    entry = _cache.get(key)
+    # Unchanged content (or a newer version installed by another request meanwhile)
+    if entry is not None and (entry["digest"] == digest or entry["signature"][0] > signature[0]):
+        if entry["digest"] == digest:
+            entry["signature"] = signature
+        _cache_stats["hits"] += 1
+        return entry, None
+
+    _cache_stats["reloads" if entry is not None else "misses"] += 1
+    replaced = entry
+    entry = {
+        "path": Path(file_path), "signature": signature, "digest": digest, "data": None, "store": None,
+        "lock": threading.Lock(),
+        # Old store, so derived aggregates can be extended rather than rebuilt
+        "previous_store": replaced["store"] if replaced is not None else None
+    }
+    _cache[key] = entry
+    return entry, replaced["digest"] if replaced is not None else None
+
+
+def _current_entry(file_path: Path) -> dict:
+    """
+    Return the cache entry for file_path.
+
+    The file is hashed (when its mtime/size changed) and reload listeners run without
+    holding _cache_lock, so a large file changing does not stall requests for others.
+    """
+    stat = os.stat(file_path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        entry = _cache.get(str(file_path))
+        if entry is not None and entry["signature"] == signature:
+            _cache_stats["hits"] += 1
+            return entry
+
+    # mtime/size changed (or first load): only drop cached results if content differs
+    digest = _file_digest(file_path)
+    with _cache_lock:
+        entry, old_version = _swap_entry(file_path, signature, digest)
+    if old_version is not None:
+        for callback in _reload_listeners:
+            callback(old_version)
+    return entry
+
+
+def _load_cached_json(file_path: Path) -> dict:
+    """Return the parsed JSON for file_path, re-parsing only when the file changed."""
+    entry = _current_entry(file_path)
+    with entry["lock"]:
+        if entry["data"] is None:
+            with open(file_path, "r") as f:
+                entry["data"] = json.load(f, object_pairs_hook=FrozenDict.from_pairs)
+        return entry["data"]
+
+
+def _snapshot_path(file_path: Path, digest: str) -> Path:
+    root = Path(SNAPSHOT_DIR) if SNAPSHOT_DIR else file_path.parent / ".snapshots"
+    return root / f"{file_path.stem}-{digest[:16]}"
+
+
+def _remove_stale_snapshots(current: Path) -> None:
+    for old in current.parent.glob(current.name.rsplit("-", 1)[0] + "-*"):
+        if old != current and old.is_dir():
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def _build_entry_store(entry: dict) -> CostStore:
+    """
+    Build the CostStore for a cache entry. Caller must hold entry["lock"].
+
+    Prefers the memory-mapped snapshot for this file version, (re)building it when
+    missing or stale. Without snapshots the store comes from the parsed dict if it
+    is already loaded, otherwise it is streamed from the file.
+    """
+    if SNAPSHOT_ENABLED:
+        directory = _snapshot_path(entry["path"], entry["digest"])
+        store = load_snapshot(directory, entry["digest"])
+        if store is not None:
+            _count("snapshot_loads")
+            return store
+        try:
+            fresh = build_cost_store(entry["data"]) if entry["data"] is not None else stream_cost_store(entry["path"])
+            save_snapshot(fresh, directory, entry["digest"])
+            _remove_stale_snapshots(directory)
+            _count("snapshot_builds")
+            return load_snapshot(directory, entry["digest"]) or fresh
+        except OSError as e:
+            print(f"WARNING: Could not write cost data snapshot ({e}). Using in-memory data.")
+
+    if entry["data"] is not None:
+        return build_cost_store(entry["data"])
+    return stream_cost_store(entry["path"])
+
+
+def _entry_store(entry: dict) -> CostStore:
+    """Return the entry's CostStore, building it on first use (under the entry's lock)."""
+    with entry["lock"]:
+        if entry["store"] is None:
+            store = _build_entry_store(entry)
+            store.version = entry["digest"]
+            previous = entry.pop("previous_store", None)
+            if previous is not None:
+                store.extend_rollup(previous)
+                store.extend_matrix(previous)
+            entry["store"] = store
+        return entry["store"]
+
+
+def _load_cached_store(file_path: Path) -> CostStore:
+    """
+    Return the CostStore for file_path, rebuilding only when the file changed.
+
+    Large exports never materialise the full JSON tree: the store is memory-mapped
+    from a snapshot or streamed from the file.
+    """
+    return _entry_store(_current_entry(file_path))
+
+
+def cost_store_for(raw_data: dict) -> CostStore:
+    """
+    Return the columnar CostStore for raw_data.
+
+    For the shared cached dataset the store is built once per dataset version and
+    reused; any other dict (e.g. hand-built test data) gets a fresh store.
+    """
+    with _cache_lock:
+        entry = next((e for e in _cache.values() if e["data"] is raw_data), None)
+    if entry is None:
+        return build_cost_store(raw_data)
+    return _entry_store(entry)
+
+
+def get_cost_data_version() -> str:
+    """Content hash of the current cost dataset (changes when the file changes)."""
+    try:
+        return _current_entry(MOCK_DATA_PATH)["digest"]
+    except FileNotFoundError:
+        raise HTTPException(status_code=500, detail="Mock cost data file not found")
+
+
+def _count(stat: str) -> None:
+    with _cache_lock:
+        _cache_stats[stat] += 1
+
+
+def get_cache_stats() -> Dict:
+    """Hit/miss/reload counters for the shared dataset cache."""
+    with _cache_lock:
+        return {**_cache_stats, "cached_files": len(_cache)}
+
+
+def clear_cache() -> None:
+    """Drop all cached datasets and reset counters (mainly for tests)."""
+    with _cache_lock:
+        _cache.clear()
+        for key in _cache_stats:
+            _cache_stats[key] = 0
+
+
 def load_mock_cost_data() -> dict:
-    """Load mock AWS cost data from JSON file."""
-    file_path = Path(__file__).parents[1]/ "aws" / "mock_cost_data.json"
+    """
+    Load mock AWS cost data from JSON file.
 
+    The parsed result is cached process-wide and shared between requests, so it
+    is read-only: callers that need to modify it must build their own copy
+    (thaw() or copy.deepcopy).
+    """
     try:
-        with open(file_path, "r") as f:
-            return json.load(f)
+        return _load_cached_json(MOCK_DATA_PATH)
     except FileNotFoundError:
         raise HTTPException(status_code=500, detail="Mock cost data file not found")
     except json.JSONDecodeError:
@@ -31,19 +280,7 @@ def load_mock_cost_data_flat() -> pd.DataFrame:
 
 def convert_aws_data_to_flat_format(raw_data: dict) -> pd.DataFrame:
     """Convert AWS Cost Explorer format to flat DataFrame."""
-    records = []
-    for day in raw_data.get("ResultsByTime", []):
-        date_str = day["TimePeriod"]["Start"]
-        for group in day["Groups"]:
-            service = group["Keys"][0]
-            amount = float(group["Metrics"]["UnblendedCost"]["Amount"])
-            records.append({
-                "date": pd.to_datetime(date_str),
-                "service": service,
-                "amount": amount
-            })
-    
-    return pd.DataFrame(records)
+    return cost_store_for(raw_data).to_frame()
 
 def get_data_source() -> str:
     """Force mock data only to prevent AWS charges."""
@@ -82,6 +319,26 @@ def load_cost_data_flat(source: str = None) -> pd.DataFrame:
     
     return load_mock_cost_data_flat()
 
+def load_cost_store(source: str = None) -> CostStore:
+    """
+    Load cost data as a columnar CostStore - ALWAYS uses mock data to prevent AWS charges.
+
+    The store is streamed from the JSON file (no full dict tree) and cached per
+    dataset version.
+
+    Args:
+        source: Ignored - always uses mock data for safety
+    """
+    if source == "real":
+        print("WARNING: Real AWS data requested but blocked to prevent charges. Using mock data.")
+
+    try:
+        return _load_cached_store(MOCK_DATA_PATH)
+    except FileNotFoundError:
+        raise HTTPException(status_code=500, detail="Mock cost data file not found")
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=500, detail="Cost data is not valid JSON")
+
 def get_data_source_info() -> Dict:
     """Get information about the current data source configuration."""
     return {
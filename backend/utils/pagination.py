@@ -0,0 +1,88 @@
+import base64
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+
+def query_hash(params: Optional[Dict[str, Any]] = None) -> str:
+    """Short hash of the query parameters (filters, sort) that define a paged result."""
+    payload = json.dumps(params or {}, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(version: str, offset: int, query: str = query_hash()) -> str:
+    """Opaque cursor for the row at `offset` of the result of `query` (a query_hash) on dataset `version`."""
+    payload = json.dumps({"v": version, "o": offset, "q": query}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, version: str, query: str = query_hash()) -> int:
+    """
+    Return the offset stored in a cursor.
+
+    Raises:
+        HTTPException: 400 for a malformed cursor or one issued for other query parameters
+            (its offset would point into a different result), 409 if the dataset changed
+            since it was issued
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        offset = int(payload["o"])
+        cursor_version = payload["v"]
+        cursor_query = payload["q"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_query != query:
+        raise HTTPException(status_code=400, detail="Cursor was issued for different query parameters")
+    if cursor_version != version:
+        raise HTTPException(status_code=409, detail="Cost data changed since this cursor was issued; start again from the first page")
+    return offset
+
+
+def page_bounds(
+    total: int, version: str, offset: int = 0, page_size: Optional[int] = None, cursor: Optional[str] = None,
+    query: Optional[Dict[str, Any]] = None
+) -> Tuple[int, int, Optional[str]]:
+    """
+    Resolve offset/page_size/cursor paging over a result of `total` rows.
+
+    `query` holds the parameters that select and order the rows (not the paging ones);
+    a cursor is only accepted with the same parameters it was issued for.
+
+    Returns:
+        (start, stop, next_cursor): the row range of this page, and the cursor of the
+        next page (None on the last page)
+    """
+    query = query_hash(query)
+    if cursor:
+        offset = decode_cursor(cursor, version, query)
+    start = min(offset, total)
+    stop = total if page_size is None else min(total, start + page_size)
+    next_cursor = encode_cursor(version, stop, query) if stop < total else None
+    return start, stop, next_cursor
+
+
+def encode_keyset_cursor(*key: Any) -> str:
+    """Opaque cursor holding the sort key of the last row of a page (keyset pagination)."""
+    payload = json.dumps({"k": list(key)}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_keyset_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Return the sort key stored in a keyset cursor.
+
+    Raises:
+        HTTPException: 400 for a malformed cursor
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))["k"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(key, list) or len(key) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
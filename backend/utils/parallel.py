@@ -0,0 +1,93 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import get_context, shared_memory
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+# Worker processes for CPU-heavy model fitting (1 disables the pool)
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", str(os.cpu_count() or 1)))
+
+_pool_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Shared process pool, started on first use. Returns None when COMPUTE_WORKERS <= 1.
+
+    Workers are spawned rather than forked: the API process runs threads (event loop,
+    BLAS, request executors) that must not be duplicated mid-operation.
+    """
+    global _pool
+    if COMPUTE_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=COMPUTE_WORKERS, mp_context=get_context("spawn"))
+        return _pool
+
+
+def shutdown_process_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+class SharedArrays:
+    """
+    Copies a set of NumPy arrays into shared memory so worker processes can read them
+    without pickling. Pass `spec` to the workers and open it with attach_shared_arrays().
+    Use as a context manager; the blocks are released on exit.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self._blocks = []
+        self.spec = {}
+        try:
+            for name, array in arrays.items():
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                self._blocks.append(block)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+                self.spec[name] = (block.name, array.shape, array.dtype.str)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+@contextmanager
+def attach_shared_arrays(spec: Dict[str, Tuple[str, tuple, str]]) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Read-only views of arrays shared by SharedArrays (worker side).
+
+    Views are only valid inside the block; copy anything that has to outlive it.
+    """
+    blocks, arrays = [], {}
+    try:
+        for name, (block_name, shape, dtype) in spec.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            view = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            view.flags.writeable = False
+            arrays[name] = view
+        yield arrays
+    finally:
+        arrays.clear()
+        for block in blocks:
+            block.close()
@@ -0,0 +1,67 @@
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Type
+
+import numpy as np
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib encoder
+    orjson = None
+
+# Validate analytics results against their response_model before sending (slow for large
+# payloads; the results are built by our own code, so by default they are trusted)
+VALIDATE_RESPONSES = os.getenv("VALIDATE_RESPONSES", "false").lower() == "true"
+
+
+def _encode_numpy(value: Any) -> Any:
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode content as compact UTF-8 JSON (orjson, NumPy arrays and scalars included, or stdlib json)."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_encode_numpy
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with dumps() instead of FastAPI's default encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def ndjson_response(chunks: Iterable[List[Dict]], headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """
+    Stream records as newline-delimited JSON, one chunk of records at a time.
+
+    `chunks` should be lazy (e.g. CostStore.iter_records), so memory stays flat
+    regardless of the result size and the first rows go out immediately.
+    """
+    def lines() -> Iterator[bytes]:
+        for records in chunks:
+            yield b"".join(dumps(record) + b"\n" for record in records)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers=headers)
+
+
+def trusted_response(content: Any, model: Optional[Type[BaseModel]] = None) -> Any:
+    """
+    Send an internally built result without FastAPI's jsonable_encoder/response_model pass.
+
+    Returning a Response bypasses both, so the content goes straight to the fast encoder.
+    With `model`, top-level keys outside the model are dropped (as validation would do).
+    When VALIDATE_RESPONSES is set, content is returned unchanged and FastAPI validates it.
+    """
+    if VALIDATE_RESPONSES:
+        return content
+    if model is not None:
+        content = {name: content[name] for name in model.model_fields if name in content}
+    return FastJSONResponse(content)
@@ -0,0 +1,55 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache for computed results, bounded by entry count and approximate size.
+
+    Keys should include the dataset fingerprint, so entries for old data simply stop
+    being requested and are evicted; invalidate() drops them eagerly.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int) -> None:
+        # Values bigger than the whole cache are not worth keeping
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats["evictions"] += 1
+
+    def invalidate(self, predicate=None) -> None:
+        """Drop every entry (or those whose key matches predicate)."""
+        with self._lock:
+            for key in [k for k in self._entries if predicate is None or predicate(k)]:
+                self._bytes -= self._entries.pop(key)[1]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
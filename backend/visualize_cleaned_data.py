@@ -6,6 +6,7 @@ import numpy as np
 from datetime import datetime, timedelta
 
 from utils.file_loader import load_mock_cost_data_flat
+from ml_utils import get_cost_matrix
 
 plt.style.use('seaborn-v0_8')  # Modern, clean look
 sns.set_palette("husl")  # Colorful but professional palette
@@ -38,13 +39,8 @@ print("-" * 30)
 
 
 # This gives us a matrix: rows = dates, columns = AWS services, values = $ amount
-pivot_df = df.pivot_table(
-    index="date",           # What goes on the rows (y-axis)
-    columns="service",      # What goes on the columns (x-axis)
-    values="amount",        # What values to put in the cells
-    aggfunc="sum",          # How to combine multiple values (sum if same service appears multiple times per day)
-    fill_value=0            # What to put in empty cells (0 for no cost)
-)
+# (shared dense matrix from ml_utils - same data every analytics route uses, no re-pivoting)
+pivot_df = get_cost_matrix().frame(datetime_index=True)
 
 print(f"Pivot table shape: {pivot_df.shape} (rows=dates, columns=services)")
 print(f"Services in pivot: {list(pivot_df.columns)}")
@@ -12,8 +12,17 @@ export interface LogEntry {
 
 export async function fetchLogs(): Promise<LogEntry[]> {
   try {
-    const res = await axios.get<LogEntry[]>(`${BASE_URL}/logs`);
-    return res.data;
+    // /logs is keyset-paginated: follow X-Next-Cursor until the last page
+    const logs: LogEntry[] = [];
+    let cursor: string | undefined;
+    do {
+      const res = await axios.get<LogEntry[]>(`${BASE_URL}/logs`, {
+        params: { limit: 1000, cursor },
+      });
+      logs.push(...res.data);
+      cursor = res.headers["x-next-cursor"] as string | undefined;
+    } while (cursor);
+    return logs;
   } catch (e) {
     console.error("Failed to fetch logs", e);
     return [];